@@ -6,8 +6,15 @@ import sv_ttk
 import time
 import os
 import json
+import random
+import re
+import heapq
+import asyncio
+import functools
 import sys
 from collections import deque
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
 import numpy as np
 import webbrowser
 
@@ -57,20 +64,458 @@ def set_azure_theme(root, mode="dark"):
     except ImportError:
         root.configure(bg="#222" if mode == "dark" else "#F5F6FA")
 
+class SerieVelas:
+    __slots__ = ('_from', '_open', '_close', '_max', '_min', '_inicio', '_fim', '_proprio')
+
+    def __init__(self, capacidade=64):
+        self._alocar(max(capacidade, 1))
+        self._inicio = 0
+        self._fim = 0
+        self._proprio = True
+
+    def _alocar(self, capacidade):
+        self._from = np.empty(capacidade, dtype=np.int64)
+        self._open = np.empty(capacidade, dtype=np.float64)
+        self._close = np.empty(capacidade, dtype=np.float64)
+        self._max = np.empty(capacidade, dtype=np.float64)
+        self._min = np.empty(capacidade, dtype=np.float64)
+
+    @classmethod
+    def de_arrays(cls, from_, open_, close, max_, min_):
+        serie = cls(len(from_))
+        n = len(from_)
+        serie._from[:n] = from_
+        serie._open[:n] = open_
+        serie._close[:n] = close
+        serie._max[:n] = max_
+        serie._min[:n] = min_
+        serie._fim = n
+        return serie
+
+    @classmethod
+    def de_velas(cls, velas):
+        n = len(velas)
+        return cls.de_arrays(
+            np.fromiter((c['from'] for c in velas), dtype=np.int64, count=n),
+            np.fromiter((c['open'] for c in velas), dtype=np.float64, count=n),
+            np.fromiter((c['close'] for c in velas), dtype=np.float64, count=n),
+            np.fromiter((c['max'] for c in velas), dtype=np.float64, count=n),
+            np.fromiter((c['min'] for c in velas), dtype=np.float64, count=n))
+
+    def _visao(self, inicio, fim):
+        visao = SerieVelas.__new__(SerieVelas)
+        visao._from, visao._open, visao._close, visao._max, visao._min = self._from, self._open, self._close, self._max, self._min
+        visao._inicio = inicio
+        visao._fim = fim
+        visao._proprio = False
+        return visao
+
+    def _realocar(self, minimo):
+        antigos = (self.from_, self.open, self.close, self.max, self.min)
+        n = len(self)
+        self._alocar(max(64, 2 * minimo))
+        for destino, origem in zip((self._from, self._open, self._close, self._max, self._min), antigos):
+            destino[:n] = origem
+        self._inicio = 0
+        self._fim = n
+        self._proprio = True
+
+    def __len__(self):
+        return self._fim - self._inicio
+
+    @property
+    def from_(self): return self._from[self._inicio:self._fim]
+
+    @property
+    def open(self): return self._open[self._inicio:self._fim]
+
+    @property
+    def close(self): return self._close[self._inicio:self._fim]
+
+    @property
+    def max(self): return self._max[self._inicio:self._fim]
+
+    @property
+    def min(self): return self._min[self._inicio:self._fim]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            inicio, fim, passo = i.indices(len(self))
+            if passo != 1: raise ValueError("SerieVelas não suporta fatias com passo.")
+            return self._visao(self._inicio + inicio, self._inicio + max(inicio, fim))
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError("Índice de vela fora da série.")
+        j = self._inicio + i
+        return {'from': int(self._from[j]), 'open': float(self._open[j]), 'close': float(self._close[j]),
+                'max': float(self._max[j]), 'min': float(self._min[j])}
+
+    def __iter__(self):
+        for f, o, c, h, l in zip(self.from_.tolist(), self.open.tolist(), self.close.tolist(), self.max.tolist(), self.min.tolist()):
+            yield {'from': f, 'open': o, 'close': c, 'max': h, 'min': l}
+
+    def append(self, vela):
+        if not self._proprio or self._fim == len(self._from):
+            self._realocar(len(self) + 1)
+        j = self._fim
+        self._from[j] = vela['from']
+        self._open[j] = vela['open']
+        self._close[j] = vela['close']
+        self._max[j] = vela['max']
+        self._min[j] = vela['min']
+        self._fim += 1
+
+    def extend(self, velas):
+        if not isinstance(velas, SerieVelas): velas = SerieVelas.de_velas(list(velas))
+        n = len(velas)
+        if not n: return
+        if not self._proprio or self._fim + n > len(self._from):
+            self._realocar(len(self) + n)
+        j = self._fim
+        self._from[j:j + n] = velas.from_
+        self._open[j:j + n] = velas.open
+        self._close[j:j + n] = velas.close
+        self._max[j:j + n] = velas.max
+        self._min[j:j + n] = velas.min
+        self._fim += n
+
+    def mesclar(self, velas):
+        campos = [np.concatenate((a, b)) for a, b in zip(
+            (self.from_, self.open, self.close, self.max, self.min),
+            (velas.from_, velas.open, velas.close, velas.max, velas.min))]
+        _, idx_reverso = np.unique(campos[0][::-1], return_index=True)
+        idx = len(campos[0]) - 1 - idx_reverso
+        mescladas = SerieVelas.de_arrays(*(campo[idx] for campo in campos))
+        self._from, self._open, self._close, self._max, self._min = mescladas._from, mescladas._open, mescladas._close, mescladas._max, mescladas._min
+        self._inicio = 0
+        self._fim = len(mescladas)
+        self._proprio = True
+
+    def posicoes(self, timestamps):
+        idx = np.searchsorted(self.from_, timestamps)
+        encontrados = idx < len(self)
+        encontrados[encontrados] = self.from_[idx[encontrados]] == np.asarray(timestamps)[encontrados]
+        return np.where(encontrados, idx, -1)
+
+    def a_partir_de(self, ts):
+        return self[int(np.searchsorted(self.from_, ts)):]
+
+    def intervalo(self, inicio, fim):
+        return self[int(np.searchsorted(self.from_, inicio)):int(np.searchsorted(self.from_, fim))]
+
+    def quadrante(self, inicio, tamanho=5, interval=60):
+        velas = self.intervalo(inicio, inicio + tamanho * interval)
+        return velas if len(velas) == tamanho else None
+
+    def lacunas(self, inicio, fim, interval=60):
+        esperados = np.arange(inicio, fim, interval)
+        return [int(ts) for ts in esperados[self.posicoes(esperados) < 0]]
+
+    def descartar_antigas(self, maximo):
+        if len(self) > maximo: self._inicio = self._fim - maximo
+
+    def copia(self):
+        return SerieVelas.de_arrays(self.from_, self.open, self.close, self.max, self.min)
+
+    def to_dicts(self):
+        return list(self)
+
+VELA_DTYPE = np.dtype([('from', '<i8'), ('open', '<f8'), ('close', '<f8'), ('max', '<f8'), ('min', '<f8')])
+
+class ArquivoVelas:
+    def __init__(self, diretorio="velas"):
+        self.diretorio = diretorio
+        self._segmentos = {}
+        self._lock = threading.Lock()
+
+    def _caminho(self, ativo, interval, extensao):
+        nome = re.sub(r'[^A-Za-z0-9_-]', '_', ativo)
+        return os.path.join(self.diretorio, f"{nome}_{interval}.{extensao}")
+
+    def _registros(self, ativo, interval):
+        caminho = self._caminho(ativo, interval, "bin")
+        if not os.path.exists(caminho) or os.path.getsize(caminho) < VELA_DTYPE.itemsize:
+            return np.empty(0, dtype=VELA_DTYPE)
+        return np.memmap(caminho, dtype=VELA_DTYPE, mode='r', shape=(os.path.getsize(caminho) // VELA_DTYPE.itemsize,))
+
+    def segmentos(self, ativo, interval):
+        key = (ativo, interval)
+        if key not in self._segmentos:
+            try:
+                with open(self._caminho(ativo, interval, "json"), "r") as f: self._segmentos[key] = json.load(f)
+            except Exception: self._segmentos[key] = []
+        return self._segmentos[key]
+
+    def ler(self, ativo, interval, primeiro_from, ultimo_from):
+        with self._lock:
+            for inicio, fim in self.segmentos(ativo, interval):
+                if inicio <= primeiro_from <= fim:
+                    registros = self._registros(ativo, interval)
+                    a = int(np.searchsorted(registros['from'], primeiro_from))
+                    b = int(np.searchsorted(registros['from'], min(ultimo_from, fim), 'right'))
+                    trecho = registros[a:b]
+                    return SerieVelas.de_arrays(trecho['from'], trecho['open'], trecho['close'], trecho['max'], trecho['min'])
+        return SerieVelas()
+
+    def cobre(self, ativo, interval, primeiro_from, ultimo_from):
+        with self._lock:
+            return any(inicio <= primeiro_from and ultimo_from <= fim for inicio, fim in self.segmentos(ativo, interval))
+
+    def anexar(self, ativo, interval, velas):
+        if not velas: return
+        with self._lock:
+            segmentos = self.segmentos(ativo, interval)
+            registros = self._registros(ativo, interval)
+            ultimo = int(registros['from'][-1]) if len(registros) else None
+            del registros
+            novas = velas if ultimo is None else velas[int(np.searchsorted(velas.from_, ultimo, 'right')):]
+            if not novas: return
+            bloco = np.empty(len(novas), dtype=VELA_DTYPE)
+            bloco['from'], bloco['open'], bloco['close'], bloco['max'], bloco['min'] = novas.from_, novas.open, novas.close, novas.max, novas.min
+            os.makedirs(self.diretorio, exist_ok=True)
+            with open(self._caminho(ativo, interval, "bin"), "ab") as f: f.write(bloco.tobytes())
+            if segmentos and segmentos[-1][1] == ultimo and velas.from_[0] <= ultimo:
+                segmentos[-1][1] = int(novas.from_[-1])
+            else:
+                segmentos.append([int(novas.from_[0]), int(novas.from_[-1])])
+            with open(self._caminho(ativo, interval, "json"), "w") as f: json.dump(segmentos, f)
+
+class _DictNotificador(dict):
+    def __init__(self, dados, callback):
+        super().__init__(dados)
+        self.callback = callback
+
+    def __setitem__(self, chave, valor):
+        super().__setitem__(chave, valor)
+        self.callback(chave, valor)
+
+def resultado_ordem_fechada(mensagem):
+    msg = mensagem['msg']
+    status = msg['win']
+    if status == 'equal': lucro = 0
+    elif status == 'loose': lucro = float(msg['sum']) * -1
+    else: lucro = float(msg['win_amount']) - float(msg['sum'])
+    return status, lucro
+
+class AcompanhadorOrdens:
+    INTERVALO_CONSULTA = 0.5
+
+    def __init__(self, api):
+        self.api = api
+        self._ordens = {}
+        self._agenda = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def registrar(self, order_id, expiracao=1, push=False):
+        with self._cond:
+            futuro = self._ordens.get(order_id)
+            if futuro is None:
+                futuro = self._ordens[order_id] = Future()
+                if not push:
+                    heapq.heappush(self._agenda, (estimar_fim_ordem(self.api.relogio.agora(), expiracao), order_id))
+                    if self._thread is None or not self._thread.is_alive():
+                        self._thread = threading.Thread(target=self._executar, daemon=True)
+                        self._thread.start()
+                    self._cond.notify()
+        return futuro
+
+    def notificar(self, order_id, mensagem):
+        with self._cond:
+            futuro = self._ordens.pop(order_id, None)
+        if futuro is not None and not futuro.done():
+            try: futuro.set_result(resultado_ordem_fechada(mensagem))
+            except Exception as e: futuro.set_exception(e)
+
+    def cancelar(self, order_id):
+        with self._cond:
+            futuro = self._ordens.pop(order_id, None)
+        if futuro is not None: futuro.cancel()
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while not self._agenda or self._agenda[0][0] > self.api.relogio.agora():
+                    self._cond.wait(self._agenda[0][0] - self.api.relogio.agora() if self._agenda else None)
+                devidas = []
+                while self._agenda and self._agenda[0][0] <= self.api.relogio.agora():
+                    _, order_id = heapq.heappop(self._agenda)
+                    if order_id in self._ordens: devidas.append(order_id)
+            for order_id in devidas:
+                try: status, lucro = self.api.check_win_v4(order_id)
+                except Exception: status, lucro = None, 0.0
+                with self._cond:
+                    futuro = self._ordens.get(order_id)
+                    if futuro is None: continue
+                    if status is None:
+                        heapq.heappush(self._agenda, (self.api.relogio.agora() + self.INTERVALO_CONSULTA, order_id))
+                        continue
+                    del self._ordens[order_id]
+                if not futuro.done(): futuro.set_result((status, lucro))
+
+class RelogioCorretora:
+    INTERVALO_AMOSTRA = 1.0
+    JANELA_AMOSTRAS = 30
+    SUAVIZACAO = 0.2
+
+    def __init__(self, fonte=None):
+        self.fonte = fonte
+        self.offset = 0.0
+        self.sincronizado = False
+        self._amostras = deque(maxlen=self.JANELA_AMOSTRAS)
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def amostrar(self):
+        if self.fonte is None: return False
+        try: servidor = self.fonte()
+        except Exception: return False
+        if not servidor: return False
+        local = time.time()
+        with self._lock:
+            self._amostras.append(float(servidor) - local)
+            estimativa = max(self._amostras)
+            if self.sincronizado: self.offset += self.SUAVIZACAO * (estimativa - self.offset)
+            else: self.offset = estimativa
+            self.sincronizado = True
+        return True
+
+    def agora(self):
+        return time.time() + self.offset
+
+    def agora_datetime(self):
+        return datetime.datetime.fromtimestamp(self.agora())
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive(): return
+        self._parar.clear()
+        self.amostrar()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _executar(self):
+        while not self._parar.wait(self.INTERVALO_AMOSTRA):
+            self.amostrar()
+
+def estimar_fim_ordem(agora, expiracao):
+    minuto = int(agora) // 60 * 60
+    if agora - minuto >= 30: minuto += 60
+    return minuto + expiracao * 60
+
+CANDLE_CACHE_SIZE = 1000
+ARQUIVO_VELAS_DIR = "velas"
+CANDLE_STREAM_SIZE = 100
+MAX_WORKERS_COLETA = 8
+PREFETCH_SEGUNDO = 55
+CICLO_SEGUNDO = 1
+TOLERANCIA_CICLO_SEGUNDOS = 5
+ESPERA_MAXIMA_SEGUNDOS = 30
+ABERTURA_VALIDADE_SEGUNDOS = 60
+LIMITE_REQUISICOES_CATALOGO = 10
+R2_EMA_PERIODO = 21
+R2_RSI_PERIODO = 2
+R2_RSI_COMPRA = 15
+R2_RSI_VENDA = 85
+R2_LATERAL_FATOR = 0.0001
+CATALOGO_R2_MINUTOS = 240
+PAGINA_HISTORICO = 1000
+CATALOGO_DIAS_MAX = 30
+CICLO_LOSS = -1
+CICLO_INVALIDO = -2
+VARREDURA_MG = (0, 1, 2, 3)
+VARREDURA_LOSS_SEGUIDOS = (1, 2, 3, 4, 5)
+VARREDURA_DOJI = (None, 2.5, 5.0, 10.0, 15.0)
+VARREDURA_ADX = (None, 15, 18, 21, 25, 30)
+VARREDURA_RSI_COMPRA = (5, 10, 15, 20, 25)
+VARREDURA_RSI_VENDA = (75, 80, 85, 90, 95)
+VARREDURA_DIAS_PADRAO = 1
+VARREDURA_MIN_AMOSTRAS = 10
+VARREDURA_TOP = 15
+ARQUIVO_VARREDURA = "varredura.json"
+MAX_PROCESSOS_CATALOGO = os.cpu_count() or 2
+MAX_WORKERS_CORRETORA = 8
+MAX_POSICOES_ABERTAS = 10
+PRAZO_ENTRADA_SEGUNDOS = 5
+ATRASO_ENTRADA_SEGUNDOS = 2.0
+ORCAMENTO_LATENCIA_SEGUNDOS = 1.0
+MARGEM_ESPERA_ATIVA = 0.002
+ENCERRAMENTO_MOTOR_SEGUNDOS = 5
+JANELA_LATENCIA = 500
+ARQUIVO_LATENCIAS = "latencias.json"
+ETAPAS_LATENCIA = (
+    ('vela_sinal', 'vela', 'sinal'),
+    ('sinal_envio', 'sinal', 'envio'),
+    ('envio_ordem', 'envio', 'ordem'),
+    ('ordem_resultado', 'ordem', 'resultado'),
+    ('vela_envio', 'vela', 'envio'),
+)
+
 class IQOptionAPI:
-    def __init__(self, email, password):
-        from iqoptionapi.stable_api import IQ_Option
-        self.api = IQ_Option(email, password)
+    def __init__(self, email, password, backend=None, arquivo=None):
+        if backend is None:
+            from iqoptionapi.stable_api import IQ_Option
+            backend = IQ_Option(email, password)
+        self.api = backend
         self.connected = False
+        self._candle_cache = {}
+        self._candle_locks = {}
+        self._streams = set()
+        self.arquivo = arquivo
+        self.relogio = RelogioCorretora(self.get_server_timestamp)
+        self._abertura = None
+        self._abertura_lock = threading.Lock()
+        self.acompanhador = AcompanhadorOrdens(self)
 
     def connect(self):
         status, reason = self.api.connect()
         self.connected = status
+        if status:
+            self._instalar_push_resultados()
+            self.relogio.iniciar()
         return status, reason
 
+    def get_server_timestamp(self):
+        return self.api.get_server_timestamp()
+
+    def _ordens_fechadas(self):
+        interna = getattr(self.api, 'api', None)
+        fechadas = getattr(interna, 'socket_option_closed', None)
+        return interna, fechadas if isinstance(fechadas, dict) else None
+
+    def _instalar_push_resultados(self):
+        interna, fechadas = self._ordens_fechadas()
+        if fechadas is None: return False
+        if not isinstance(fechadas, _DictNotificador):
+            interna.socket_option_closed = _DictNotificador(fechadas, self._ordem_fechada)
+        return True
+
+    def _ordem_fechada(self, order_id, mensagem):
+        self.acompanhador.notificar(order_id, mensagem)
+
+    def aguardar_resultado(self, order_id, expiracao=1):
+        if not self._instalar_push_resultados():
+            return self.acompanhador.registrar(order_id, expiracao)
+        futuro = self.acompanhador.registrar(order_id, expiracao, push=True)
+        mensagem = self._ordens_fechadas()[1].get(order_id)
+        if mensagem is not None: self.acompanhador.notificar(order_id, mensagem)
+        return futuro
+
+    def descartar_resultado(self, order_id):
+        self.acompanhador.cancelar(order_id)
+
     def disconnect(self):
+        self.relogio.parar()
+        fechar = getattr(self.api, 'close', None)
+        if callable(fechar):
+            try: fechar()
+            except Exception: pass
         self.api = None
         self.connected = False
+        self._candle_cache.clear()
+        self._streams.clear()
 
     def change_balance(self, tipo):
         self.api.change_balance(tipo)
@@ -84,11 +529,137 @@ class IQOptionAPI:
     def get_all_profit(self):
         return self.api.get_all_profit()
 
-    def get_candles(self, ativo, interval, n, now=None):
-        now = now or time.time()
+    def ativo_aberto(self, ativo):
+        with self._abertura_lock:
+            if self._abertura is None or self.relogio.agora() - self._abertura[0] > ABERTURA_VALIDADE_SEGUNDOS:
+                self._abertura = (self.relogio.agora(), self.api.get_all_open_time() or {})
+            todos = self._abertura[1]
+        conhecidos = [status for tipo in ('turbo', 'binary', 'digital') if isinstance(todos.get(tipo), dict)
+                      for status in [todos[tipo].get(ativo)] if isinstance(status, dict)]
+        return not conhecidos or any(status.get('open') for status in conhecidos)
+
+    def _fetch_candles(self, ativo, interval, n, now):
         candles = self.api.get_candles(ativo, interval, n, now)
-        if not candles: return []
-        return sorted(candles, key=lambda x: x['from'])
+        if not candles: return SerieVelas()
+        return SerieVelas.de_velas(sorted(candles, key=lambda x: x['from']))
+
+    def start_candles_stream(self, ativo, interval, maxdict=CANDLE_STREAM_SIZE):
+        self.api.start_candles_stream(ativo, interval, maxdict)
+        self._streams.add((ativo, interval))
+
+    def stop_candles_stream(self, ativo, interval):
+        self._streams.discard((ativo, interval))
+        try: self.api.stop_candles_stream(ativo, interval)
+        except Exception: pass
+
+    def _buscar_janela(self, ativo, interval, n, now, primeiro_from, ultimo_from):
+        if self.arquivo is not None:
+            arquivadas = self.arquivo.ler(ativo, interval, primeiro_from, ultimo_from)
+            faltando = int(ultimo_from - arquivadas.from_[-1]) // interval if arquivadas else n
+            if arquivadas and arquivadas.from_[0] == primeiro_from and len(arquivadas) + faltando == n:
+                if not faltando: return arquivadas
+                topo = self._fetch_candles(ativo, interval, faltando, now)
+                if topo and topo.from_[0] == arquivadas.from_[-1] + interval:
+                    arquivadas.extend(topo)
+                    return arquivadas
+        return self._fetch_candles(ativo, interval, n, now)
+
+    def _completar_arquivo(self, ativo, interval, primeiro_from, ultimo_from, pagina=PAGINA_HISTORICO, limitador=None):
+        if self.arquivo is None: return
+        segmentos = self.arquivo.segmentos(ativo, interval)
+        cursor = segmentos[-1][1] if segmentos and segmentos[-1][1] >= primeiro_from else primeiro_from - interval
+        while cursor < ultimo_from:
+            fim = min(ultimo_from, cursor + (pagina - 1) * interval)
+            if limitador: limitador.aguardar()
+            velas = self._fetch_candles(ativo, interval, int(fim - cursor) // interval + 1, fim)
+            velas = velas[:int(np.searchsorted(velas.from_, fim, 'right'))]
+            if not velas: break
+            self._arquivar(ativo, interval, velas)
+            cursor = fim
+
+    def historico_velas(self, ativo, interval, inicio, fim, antes=0, depois=0, pagina=PAGINA_HISTORICO, limitador=None):
+        inicio, fim = int(inicio) // interval * interval, int(fim) // interval * interval
+        self._completar_arquivo(ativo, interval, inicio - antes * interval, fim, pagina, limitador)
+        tamanho = max(1, pagina - antes - depois)
+        proprio_fim = fim
+        while proprio_fim >= inicio:
+            proprio_inicio = max(inicio, proprio_fim - (tamanho - 1) * interval)
+            primeiro_from, ultimo_from = proprio_inicio - antes * interval, min(fim, proprio_fim + depois * interval)
+            n = int(ultimo_from - primeiro_from) // interval + 1
+            if self.arquivo is not None and self.arquivo.cobre(ativo, interval, primeiro_from, ultimo_from):
+                velas = self.arquivo.ler(ativo, interval, primeiro_from, ultimo_from)
+                esgotado = False
+            else:
+                if limitador: limitador.aguardar()
+                velas = self._fetch_candles(ativo, interval, n, ultimo_from)
+                velas = velas[:int(np.searchsorted(velas.from_, ultimo_from, 'right'))]
+                esgotado = len(velas) < n
+            if velas: yield velas, proprio_inicio, proprio_fim
+            if esgotado: break
+            proprio_fim = proprio_inicio - interval
+
+    def _arquivar(self, ativo, interval, cache):
+        if self.arquivo is None: return
+        try: self.arquivo.anexar(ativo, interval, cache)
+        except OSError: pass
+
+    def _stream_candles(self, ativo, interval):
+        tempo_real = self.api.get_realtime_candles(ativo, interval)
+        if not tempo_real: return SerieVelas()
+        return SerieVelas.de_velas(sorted(tempo_real.copy().values(), key=lambda x: x['from']))
+
+    def _store_candles(self, cache, candles, interval):
+        limite_fechadas = int(self.relogio.agora()) // interval * interval
+        fechadas = candles[:int(np.searchsorted(candles.from_, limite_fechadas))]
+        if not fechadas: return
+        if not cache or fechadas.from_[0] > cache.from_[-1]:
+            cache.extend(fechadas)
+        elif fechadas.from_[0] >= cache.from_[0]:
+            cache.extend(fechadas[int(np.searchsorted(fechadas.from_, cache.from_[-1], 'right')):])
+        else:
+            cache.mesclar(fechadas)
+        cache.descartar_antigas(CANDLE_CACHE_SIZE)
+
+    def get_candles(self, ativo, interval, n, now=None):
+        now = now or self.relogio.agora()
+        key = (ativo, interval)
+        lock = self._candle_locks.setdefault(key, threading.Lock())
+        with lock:
+            cache = self._candle_cache.setdefault(key, SerieVelas())
+            ultimo_from = int(now) // interval * interval
+            primeiro_from = ultimo_from - (n - 1) * interval
+            novas = self._stream_candles(ativo, interval) if key in self._streams else SerieVelas()
+            if novas:
+                if cache and novas.from_[0] > cache.from_[-1]:
+                    cache.descartar_antigas(0)
+                self._store_candles(cache, novas, interval)
+                self._arquivar(ativo, interval, cache)
+            cobre_inicio = bool(cache) and cache.from_[0] <= primeiro_from
+            tem_ultima = (bool(cache) and cache.from_[-1] >= ultimo_from) or bool(np.any(novas.from_ == ultimo_from))
+            if cobre_inicio and tem_ultima:
+                pass
+            elif cobre_inicio and (ultimo_from - cache.from_[-1]) // interval <= n:
+                novas = self._fetch_candles(ativo, interval, int(ultimo_from - cache.from_[-1]) // interval, now)
+                if not novas: return novas
+                self._store_candles(cache, novas, interval)
+                self._arquivar(ativo, interval, cache)
+            else:
+                novas = self._buscar_janela(ativo, interval, n, now, primeiro_from, ultimo_from)
+                if not novas: return novas
+                if cache and novas.from_[0] > cache.from_[-1]:
+                    cache.descartar_antigas(0)
+                if n <= CANDLE_CACHE_SIZE and (not cache or novas.from_[-1] >= cache.from_[0]):
+                    self._store_candles(cache, novas, interval)
+                    self._arquivar(ativo, interval, cache)
+                else:
+                    return novas[-n:]
+            velas = cache[:int(np.searchsorted(cache.from_, ultimo_from, 'right'))]
+            ultimo_cache = velas.from_[-1] if velas else -1
+            extras = novas[int(np.searchsorted(novas.from_, ultimo_cache, 'right')):int(np.searchsorted(novas.from_, ultimo_from, 'right'))]
+            if extras:
+                velas = velas[-n:].copia()
+                velas.extend(extras)
+            return velas[-n:]
 
     def buy(self, valor, ativo, direcao, exp):
         return self.api.buy(valor, ativo, direcao, exp)
@@ -97,92 +668,570 @@ class IQOptionAPI:
         return self.api.check_win_v4(order_id)
     
     def get_ema(self, ativo, period=21, size=60):
-        n_candles = period * 3
-        candles = self.get_candles(ativo, size, n_candles)
-        if len(candles) < period:
-            return None, None
-        
-        closes = np.array([c['close'] for c in candles])
-        ema = np.zeros_like(closes)
-        
-        ema[period-1] = np.mean(closes[:period])
-        
-        k = 2 / (period + 1)
-        
-        for i in range(period, len(closes)):
-            ema[i] = closes[i] * k + ema[i-1] * (1-k)
-        
-        return ema[-1], ema[-5:]
+        return calcular_ema(self.get_candles(ativo, size, period * 3), period)
 
     def get_rsi(self, ativo, period=2, size=60):
-        n_candles = period + 50
-        candles = self.get_candles(ativo, size, n_candles)
-        if len(candles) < period + 1:
-            return None
-        
-        closes = np.array([c['close'] for c in candles])
-        deltas = np.diff(closes)
-        seed = deltas[:period]
-        
-        gains = seed[seed >= 0].sum() / period
-        losses = -seed[seed < 0].sum() / period
-        
-        rs = gains / losses if losses != 0 else np.inf
-        
-        for i in range(period, len(deltas)):
-            delta = deltas[i]
-            if delta > 0:
-                gains = (gains * (period - 1) + delta) / period
-                losses = (losses * (period - 1)) / period
-            else:
-                losses = (losses * (period - 1) - delta) / period
-                gains = (gains * (period - 1)) / period
-        
+        return calcular_rsi(self.get_candles(ativo, size, period + 50), period)
+
+    def get_adx(self, ativo, period=14, size=60):
+        return calcular_adx(self.get_candles(ativo, size, period + 2), period)
+
+def calcular_ema(candles, period=21):
+    return _ema_fechamentos(candles.close, period)
+
+def _ema_fechamentos(closes, period):
+    if len(closes) < period:
+        return None, None
+    
+    ema = np.zeros_like(closes)
+    
+    ema[period-1] = np.mean(closes[:period])
+    
+    k = 2 / (period + 1)
+    
+    for i in range(period, len(closes)):
+        ema[i] = closes[i] * k + ema[i-1] * (1-k)
+    
+    return ema[-1], ema[-5:]
+
+def calcular_rsi(candles, period=2):
+    return _rsi_fechamentos(candles.close, period)
+
+def _rsi_fechamentos(closes, period):
+    if len(closes) < period + 1:
+        return None
+    
+    deltas = np.diff(closes)
+    seed = deltas[:period]
+    
+    gains = seed[seed >= 0].sum() / period
+    losses = -seed[seed < 0].sum() / period
+    
+    for i in range(period, len(deltas)):
+        delta = deltas[i]
+        if delta > 0:
+            gains = (gains * (period - 1) + delta) / period
+            losses = (losses * (period - 1)) / period
+        else:
+            losses = (losses * (period - 1) - delta) / period
+            gains = (gains * (period - 1)) / period
+    
+    rs = gains / losses if losses != 0 else np.inf
+    rsi_val = 100 - (100 / (1 + rs))
+
+    return rsi_val
+
+def calcular_adx(candles, period=14):
+    return _adx_arrays(candles.max, candles.min, candles.close, period)
+
+def _adx_arrays(highs, lows, closes, period):
+    if len(closes) < period + 1:
+        return None
+    plus_dm = highs[1:] - highs[:-1]
+    minus_dm = lows[:-1] - lows[1:]
+    plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0)
+    minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), minus_dm, 0)
+    tr = np.maximum.reduce([
+        highs[1:] - lows[1:],
+        np.abs(highs[1:] - closes[:-1]),
+        np.abs(lows[1:] - closes[:-1])
+    ])
+    period = min(period, len(tr))
+    atr = np.zeros_like(tr)
+    atr[0] = tr[:period].mean()
+    for i in range(1, len(tr)):
+        atr[i] = (atr[i-1]*(period-1) + tr[i])/period
+    plus_di = 100 * (plus_dm/atr)
+    minus_di = 100 * (minus_dm/atr)
+    dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di + 1e-9)
+    adx = np.zeros_like(dx)
+    adx[0] = dx[:period].mean()
+    for i in range(1, len(dx)):
+        adx[i] = (adx[i-1]*(period-1) + dx[i])/period
+    return float(adx[-2]) if len(adx) >= 2 else float(adx[-1])
+
+def empilhar_janelas(series, n):
+    fechamentos = np.full((len(series), n), np.nan)
+    maximas = np.full((len(series), n), np.nan)
+    minimas = np.full((len(series), n), np.nan)
+    for i, velas in enumerate(series):
+        if not velas: continue
+        janela = velas[-n:]
+        inicio = n - len(janela)
+        fechamentos[i, inicio:] = janela.close
+        maximas[i, inicio:] = janela.max
+        minimas[i, inicio:] = janela.min
+    return fechamentos, maximas, minimas
+
+def _linhas_incompletas(*matrizes):
+    return np.flatnonzero(np.isnan(np.stack(matrizes)).any(axis=(0, 2)))
+
+def calcular_ema_lote(closes, period=21):
+    closes = closes[:, -(period * 3):]
+    n_ativos, n = closes.shape
+    ema = np.full(n_ativos, np.nan)
+    ultimos_5 = np.full((n_ativos, min(5, n)), np.nan)
+    if n >= period:
+        historico = np.zeros((n_ativos, n))
+        historico[:, period-1] = np.mean(closes[:, :period], axis=1)
+        k = 2 / (period + 1)
+        for i in range(period, n):
+            historico[:, i] = closes[:, i] * k + historico[:, i-1] * (1-k)
+        ema, ultimos_5 = historico[:, -1].copy(), historico[:, -5:].copy()
+    for i in _linhas_incompletas(closes):
+        valores = closes[i][~np.isnan(closes[i])]
+        ema_val, ultimos = _ema_fechamentos(valores, period)
+        ema[i] = np.nan if ema_val is None else ema_val
+        ultimos_5[i] = np.nan
+        if ultimos is not None: ultimos_5[i, -len(ultimos):] = ultimos
+    return ema, ultimos_5
+
+def calcular_rsi_lote(closes, period=2):
+    closes = closes[:, -(period + 50):]
+    n_ativos, n = closes.shape
+    rsi = np.full(n_ativos, np.nan)
+    if n >= period + 1:
+        deltas = np.diff(closes, axis=1)
+        seed = deltas[:, :period]
+        gains = np.where(seed >= 0, seed, 0).sum(axis=1) / period
+        losses = -np.where(seed < 0, seed, 0).sum(axis=1) / period
+        for i in range(period, deltas.shape[1]):
+            delta = deltas[:, i]
+            alta = delta > 0
+            gains, losses = (
+                np.where(alta, (gains * (period - 1) + delta) / period, (gains * (period - 1)) / period),
+                np.where(alta, (losses * (period - 1)) / period, (losses * (period - 1) - delta) / period))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.where(losses != 0, gains / losses, np.inf)
+        rsi = 100 - (100 / (1 + rs))
+    for i in _linhas_incompletas(closes):
+        valor = _rsi_fechamentos(closes[i][~np.isnan(closes[i])], period)
+        rsi[i] = np.nan if valor is None else valor
+    return rsi
+
+def calcular_adx_lote(highs, lows, closes, period=14):
+    n_janela = period + 2
+    highs, lows, closes = highs[:, -n_janela:], lows[:, -n_janela:], closes[:, -n_janela:]
+    n_ativos, n = closes.shape
+    resultado = np.full(n_ativos, np.nan)
+    if n >= period + 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plus_dm = highs[:, 1:] - highs[:, :-1]
+            minus_dm = lows[:, :-1] - lows[:, 1:]
+            plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0)
+            minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), minus_dm, 0)
+            tr = np.maximum.reduce([
+                highs[:, 1:] - lows[:, 1:],
+                np.abs(highs[:, 1:] - closes[:, :-1]),
+                np.abs(lows[:, 1:] - closes[:, :-1])
+            ])
+            periodo = min(period, tr.shape[1])
+            atr = np.zeros_like(tr)
+            atr[:, 0] = tr[:, :periodo].mean(axis=1)
+            for i in range(1, tr.shape[1]):
+                atr[:, i] = (atr[:, i-1]*(periodo-1) + tr[:, i])/periodo
+            plus_di = 100 * (plus_dm/atr)
+            minus_di = 100 * (minus_dm/atr)
+            dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di + 1e-9)
+            adx = np.zeros_like(dx)
+            adx[:, 0] = dx[:, :periodo].mean(axis=1)
+            for i in range(1, dx.shape[1]):
+                adx[:, i] = (adx[:, i-1]*(periodo-1) + dx[:, i])/periodo
+        resultado = adx[:, -2].copy() if adx.shape[1] >= 2 else adx[:, -1].copy()
+    for i in _linhas_incompletas(highs, lows, closes):
+        validos = ~(np.isnan(highs[i]) | np.isnan(lows[i]) | np.isnan(closes[i]))
+        valor = _adx_arrays(highs[i][validos], lows[i][validos], closes[i][validos], period)
+        resultado[i] = np.nan if valor is None else valor
+    return resultado
+
+INDICADOR_RESSINCRONIZAR = 1000
+
+class _JanelaSuavizada:
+    def __init__(self, periodo, janela, k):
+        self.periodo = periodo
+        self.janela = janela
+        self.k = k
+        self.a = 1 - k
+        self.peso_saida = self.a ** (janela - periodo - 1)
+        self.fator_cabeca = self.a ** (janela - periodo)
+        self.cabeca = deque()
+        self.cauda = deque()
+        self.soma_cabeca = 0.0
+        self.soma_cauda = 0.0
+        self.nao_nulos = 0
+        self.atualizacoes = 0
+
+    def __len__(self):
+        return len(self.cabeca) + len(self.cauda)
+
+    def cheia(self):
+        return len(self) == self.janela
+
+    def valores(self):
+        return list(self.cabeca) + list(self.cauda)
+
+    def adicionar(self, x):
+        if self.cheia():
+            antigo = self.cauda.popleft()
+            saiu = self.cabeca.popleft()
+            self.soma_cauda = self.a * (self.soma_cauda - self.peso_saida * antigo) + x
+            self.soma_cabeca += antigo - saiu
+            self.cabeca.append(antigo)
+            self.cauda.append(x)
+            if saiu != 0: self.nao_nulos -= 1
+        elif len(self.cabeca) < self.periodo:
+            self.cabeca.append(x)
+            self.soma_cabeca += x
+        else:
+            self.cauda.append(x)
+            self.soma_cauda = self.a * self.soma_cauda + x
+        if x != 0: self.nao_nulos += 1
+        self.atualizacoes += 1
+        if self.atualizacoes % INDICADOR_RESSINCRONIZAR == 0:
+            self.soma_cabeca = sum(self.cabeca)
+            self.soma_cauda = 0.0
+            for valor in self.cauda: self.soma_cauda = self.a * self.soma_cauda + valor
+
+    def suavizado(self, extra=None):
+        soma_cabeca, soma_cauda, nao_nulos = self.soma_cabeca, self.soma_cauda, self.nao_nulos
+        if extra is not None:
+            antigo, saiu = self.cauda[0], self.cabeca[0]
+            soma_cauda = self.a * (soma_cauda - self.peso_saida * antigo) + extra
+            soma_cabeca += antigo - saiu
+            nao_nulos += int(extra != 0) - int(saiu != 0)
+        if not nao_nulos: return 0.0
+        return self.fator_cabeca * soma_cabeca / self.periodo + self.k * soma_cauda
+
+class EmaIncremental:
+    def __init__(self, period=21):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self.janela = _JanelaSuavizada(period, period * 3, self.k)
+
+    def atualizar(self, close):
+        self.janela.adicionar(float(close))
+
+    def valor(self, close_atual=None):
+        if not self.janela.cheia() or self.janela.janela - self.period < 5:
+            closes = self.janela.valores() + ([close_atual] if close_atual is not None else [])
+            return _ema_fechamentos(np.array(closes[-self.janela.janela:], dtype=np.float64), self.period)
+        ultimos = list(self.janela.cauda)[-5:] if close_atual is None else list(self.janela.cauda)[-4:] + [close_atual]
+        ema = np.empty(5)
+        ema[4] = self.janela.suavizado(close_atual)
+        for i in range(4, 0, -1):
+            ema[i - 1] = (ema[i] - self.k * ultimos[i]) / (1 - self.k)
+        return ema[4], ema
+
+class RsiIncremental:
+    def __init__(self, period=2):
+        self.period = period
+        self.closes = deque(maxlen=period + 50)
+        self.ganhos = _JanelaSuavizada(period, period + 49, 1 / period)
+        self.perdas = _JanelaSuavizada(period, period + 49, 1 / period)
+
+    def atualizar(self, close):
+        close = float(close)
+        if self.closes:
+            delta = close - self.closes[-1]
+            self.ganhos.adicionar(delta if delta > 0 else 0.0)
+            self.perdas.adicionar(-delta if delta < 0 else 0.0)
+        self.closes.append(close)
+
+    def valor(self, close_atual=None):
+        if not self.ganhos.cheia():
+            closes = list(self.closes) + ([close_atual] if close_atual is not None else [])
+            return _rsi_fechamentos(np.array(closes[-self.closes.maxlen:], dtype=np.float64), self.period)
+        if close_atual is None:
+            gains, losses = self.ganhos.suavizado(), self.perdas.suavizado()
+        else:
+            delta = close_atual - self.closes[-1]
+            gains = self.ganhos.suavizado(delta if delta > 0 else 0.0)
+            losses = self.perdas.suavizado(-delta if delta < 0 else 0.0)
         rs = gains / losses if losses != 0 else np.inf
-        rsi_val = 100 - (100 / (1 + rs))
+        return 100 - (100 / (1 + rs))
+
+class AdxIncremental:
+    def __init__(self, period=14):
+        self.period = period
+        self.velas = SerieVelas(period + 2)
+
+    def atualizar(self, vela):
+        self.velas.append(vela)
+        self.velas.descartar_antigas(self.period + 2)
+
+    def valor(self, vela_atual=None):
+        if vela_atual is None:
+            return calcular_adx(self.velas, self.period)
+        janela = self.velas[-(self.period + 1):].copia()
+        janela.append(vela_atual)
+        return calcular_adx(janela, self.period)
+
+class IndicadoresAtivo:
+    def __init__(self, ema_period=21, rsi_period=2, adx_period=14):
+        self.ema = EmaIncremental(ema_period)
+        self.rsi = RsiIncremental(rsi_period)
+        self.adx = AdxIncremental(adx_period)
+        self.ultimo_from = None
+        self.ultima_vela = None
+
+    def atualizar(self, vela):
+        if self.ultimo_from is not None and vela['from'] <= self.ultimo_from: return
+        self.ema.atualizar(vela['close'])
+        self.rsi.atualizar(vela['close'])
+        self.adx.atualizar(vela)
+        self.ultimo_from = vela['from']
+        self.ultima_vela = vela
+
+    def semear(self, velas):
+        for vela in velas: self.atualizar(vela)
+
+    def valores(self, vela_atual=None):
+        close_atual = float(vela_atual['close']) if vela_atual is not None else None
+        ema_val, ema_ultimos_5 = self.ema.valor(close_atual)
+        return {
+            'ema': ema_val,
+            'ema_ultimos_5': ema_ultimos_5,
+            'rsi': self.rsi.valor(close_atual),
+            'adx': self.adx.valor(vela_atual),
+            'ultima_vela': vela_atual if vela_atual is not None else self.ultima_vela
+        }
 
-        return rsi_val
+class FeedVelasSimulado:
+    def __init__(self, seed=0, preco_base=1.0, volatilidade=0.0005, relogio=time.time):
+        self.seed = seed
+        self.preco_base = preco_base
+        self.volatilidade = volatilidade
+        self.relogio = relogio
+        self.streams = {}
+
+    def _nivel(self, ativo, ts):
+        rnd = random.Random(f"{self.seed}:{ativo}:{ts}")
+        return self.preco_base * (1 + self.volatilidade * rnd.uniform(-1, 1))
+
+    def _vela(self, ativo, interval, ts, agora):
+        abertura = self._nivel(ativo, ts)
+        fechamento_final = self._nivel(ativo, ts + interval)
+        progresso = min(1.0, max(0.0, (agora - ts) / interval))
+        fechamento = abertura + (fechamento_final - abertura) * progresso
+        rnd = random.Random(f"{self.seed}:{ativo}:{ts}:pavio")
+        pavio = self.preco_base * self.volatilidade * 0.2 * progresso
+        return {
+            'id': ts // interval, 'from': ts, 'to': ts + interval, 'at': int(min(agora, ts + interval) * 1e9),
+            'open': abertura, 'close': fechamento,
+            'max': max(abertura, fechamento) + pavio * rnd.random(),
+            'min': min(abertura, fechamento) - pavio * rnd.random(),
+            'volume': 0
+        }
 
-    def get_adx(self, ativo, period=14, size=60):
-        try:
-            import numpy as np
-        except ImportError:
-            return None
-        n_candles = period + 2
-        candles = self.get_candles(ativo, size, n_candles)
-        if len(candles) < period + 1:
-            return None
-        closes = [c['close'] for c in candles]
-        highs = [c['max'] for c in candles]
-        lows = [c['min'] for c in candles]
-        closes = list(closes)
-        highs = list(highs)
-        lows = list(lows)
-        closes = np.array(closes)
-        highs = np.array(highs)
-        lows = np.array(lows)
-        plus_dm = highs[1:] - highs[:-1]
-        minus_dm = lows[:-1] - lows[1:]
-        plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0)
-        minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), minus_dm, 0)
-        tr = np.maximum.reduce([
-            highs[1:] - lows[1:],
-            np.abs(highs[1:] - closes[:-1]),
-            np.abs(lows[1:] - closes[:-1])
-        ])
-        period = min(period, len(tr))
-        atr = np.zeros_like(tr)
-        atr[0] = tr[:period].mean()
-        for i in range(1, len(tr)):
-            atr[i] = (atr[i-1]*(period-1) + tr[i])/period
-        plus_di = 100 * (plus_dm/atr)
-        minus_di = 100 * (minus_dm/atr)
-        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di + 1e-9)
-        adx = np.zeros_like(dx)
-        adx[0] = dx[:period].mean()
-        for i in range(1, len(dx)):
-            adx[i] = (adx[i-1]*(period-1) + dx[i])/period
-        return float(adx[-2]) if len(adx) >= 2 else float(adx[-1])
+    def get_candles(self, ativo, interval, n, now):
+        agora = self.relogio()
+        ultimo = int(min(now, agora)) // interval * interval
+        return [self._vela(ativo, interval, ultimo - i * interval, agora) for i in range(n - 1, -1, -1)]
+
+    def start_candles_stream(self, ativo, interval, maxdict):
+        self.streams[(ativo, interval)] = maxdict
+
+    def stop_candles_stream(self, ativo, interval):
+        self.streams.pop((ativo, interval), None)
+
+    def get_realtime_candles(self, ativo, interval):
+        maxdict = self.streams.get((ativo, interval))
+        if not maxdict: return {}
+        return {c['from']: c for c in self.get_candles(ativo, interval, maxdict, self.relogio())}
+
+PAYOUT_SIMULADO = 0.87
+SALDO_SIMULADO = 10000.0
+ATIVOS_SIMULADOS = ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "EURJPY", "EURGBP", "EURUSD-OTC", "GBPUSD-OTC"]
+
+class _SessaoSimulada:
+    def __init__(self):
+        self.socket_option_closed = {}
+
+class CorretoraSimulada(FeedVelasSimulado):
+    INTERVALO_LIQUIDACAO = 0.05
+
+    def __init__(self, seed=0, saldo=SALDO_SIMULADO, payouts=None, latencia=0.0, ativos=None, velas=None, fechados=(), relogio=time.time, **kwargs):
+        super().__init__(seed=seed, relogio=relogio, **kwargs)
+        self.api = _SessaoSimulada()
+        self.saldo = float(saldo)
+        self.latencia = latencia
+        self.velas = {ativo: SerieVelas.de_velas(sorted(lista, key=lambda x: x['from'])) for ativo, lista in (velas or {}).items()}
+        self.ativos = list(ativos or self.velas or ATIVOS_SIMULADOS)
+        self.payouts = {ativo: (payouts or {}).get(ativo, PAYOUT_SIMULADO) for ativo in self.ativos}
+        self.fechados = set(fechados)
+        self.tipo_conta = "PRACTICE"
+        self._ordens = {}
+        self._resultados = {}
+        self._proximo_id = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._parar = threading.Event()
+
+    def _esperar(self, chave):
+        atraso = random.Random(f"{self.seed}:{chave}").uniform(*self.latencia) if isinstance(self.latencia, tuple) else self.latencia
+        if atraso > 0: time.sleep(atraso)
+        return atraso
+
+    def connect(self):
+        self._esperar("connect")
+        self._parar.clear()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._executar, daemon=True)
+            self._thread.start()
+        return True, None
+
+    def get_server_timestamp(self):
+        return self.relogio()
+
+    def change_balance(self, tipo):
+        self.tipo_conta = tipo
+
+    def get_balance(self):
+        self._esperar("balance")
+        with self._lock:
+            return round(self.saldo, 2)
+
+    def get_all_open_time(self):
+        self._esperar("open_time")
+        status = {ativo: {'open': ativo not in self.fechados} for ativo in self.ativos}
+        return {'turbo': dict(status), 'binary': dict(status), 'digital': dict(status)}
+
+    def get_all_profit(self):
+        self._esperar("profit")
+        return {ativo: {'turbo': payout, 'binary': payout} for ativo, payout in self.payouts.items()}
+
+    def get_candles(self, ativo, interval, n, now):
+        self._esperar(f"candles:{ativo}:{int(now)}")
+        gravadas = self.velas.get(ativo)
+        if gravadas is None: return super().get_candles(ativo, interval, n, now)
+        fim = int(np.searchsorted(gravadas.from_, min(now, self.relogio()), 'right'))
+        return gravadas[max(0, fim - n):fim].to_dicts()
+
+    def preco(self, ativo, instante):
+        gravadas = self.velas.get(ativo)
+        if gravadas is None:
+            inicio = int(instante) // 60 * 60
+            return self._vela(ativo, 60, inicio, instante)['close'] if instante > inicio else self._nivel(ativo, inicio)
+        i = int(np.searchsorted(gravadas.from_, instante)) - 1
+        if i < 0: return None
+        return gravadas.close[i] if instante >= gravadas.from_[i] + 60 else gravadas.open[i]
+
+    def buy(self, valor, ativo, direcao, exp):
+        with self._lock:
+            self._proximo_id += 1
+            order_id = self._proximo_id
+        self._esperar(f"buy:{order_id}")
+        agora = self.relogio()
+        entrada = self.preco(ativo, agora)
+        with self._lock:
+            if ativo in self.fechados or ativo not in self.payouts or entrada is None or valor > self.saldo:
+                return False, None
+            self.saldo -= valor
+            self._ordens[order_id] = {'ativo': ativo, 'direcao': direcao, 'valor': valor, 'entrada': entrada,
+                                      'expira': estimar_fim_ordem(agora, exp), 'payout': self.payouts[ativo]}
+        return True, order_id
+
+    def liquidar(self):
+        agora = self.relogio()
+        with self._lock:
+            vencidas = [order_id for order_id, ordem in self._ordens.items() if ordem['expira'] <= agora]
+            ordens = [(order_id, self._ordens.pop(order_id)) for order_id in vencidas]
+        for order_id, ordem in ordens:
+            saida = self.preco(ordem['ativo'], ordem['expira'])
+            if saida is None or saida == ordem['entrada']: status, retorno = 'equal', ordem['valor']
+            elif (saida > ordem['entrada']) == (ordem['direcao'] == 'call'): status, retorno = 'win', ordem['valor'] * (1 + ordem['payout'])
+            else: status, retorno = 'loose', 0.0
+            with self._lock:
+                self.saldo += retorno
+                self._resultados[order_id] = (status, retorno - ordem['valor'])
+            self.api.socket_option_closed[order_id] = {'msg': {'win': status, 'sum': ordem['valor'], 'win_amount': retorno}}
+        return len(ordens)
+
+    def check_win_v4(self, order_id):
+        self._esperar(f"check:{order_id}")
+        self.liquidar()
+        with self._lock:
+            return self._resultados.get(order_id, (None, 0.0))
+
+    def close(self):
+        self._parar.set()
+
+    def _executar(self):
+        while not self._parar.wait(self.INTERVALO_LIQUIDACAO):
+            self.liquidar()
+
+class MedidorLatencia:
+    def __init__(self, janela=JANELA_LATENCIA):
+        self.janela = janela
+        self._amostras = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, ativo, marcas):
+        with self._lock:
+            etapas = self._amostras.setdefault(ativo, {})
+            for nome, inicio, fim in ETAPAS_LATENCIA:
+                if marcas.get(inicio) is None or marcas.get(fim) is None: continue
+                etapas.setdefault(nome, deque(maxlen=self.janela)).append(marcas[fim] - marcas[inicio])
+
+    def _copiar(self):
+        with self._lock:
+            return {ativo: {nome: list(valores) for nome, valores in etapas.items()} for ativo, etapas in self._amostras.items()}
+
+    @staticmethod
+    def _resumir(valores):
+        p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+        return {'n': len(valores), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+    def percentis(self):
+        return {ativo: {nome: self._resumir(valores) for nome, valores in etapas.items()} for ativo, etapas in self._copiar().items()}
+
+    def geral(self, etapa):
+        valores = [v for etapas in self._copiar().values() for v in etapas.get(etapa, ())]
+        return self._resumir(valores) if valores else None
+
+    def exportar(self, caminho=ARQUIVO_LATENCIAS):
+        dados = {'gerado_em': datetime.datetime.now().isoformat(timespec='seconds'), 'percentis': self.percentis(), 'amostras': self._copiar()}
+        with open(caminho, "w") as f:
+            json.dump(dados, f, indent=2)
+        return caminho
+
+class MotorEntradas:
+    def __init__(self, workers=MAX_WORKERS_CORRETORA, relogio=time.time):
+        self.relogio = relogio
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="corretora")
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def _executar(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def agendar(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def chamar(self, funcao, *args, **kwargs):
+        return await self.loop.run_in_executor(None, functools.partial(funcao, *args, **kwargs))
+
+    async def aguardar_ate(self, instante):
+        alvo = time.perf_counter() + (instante - self.relogio())
+        while True:
+            restante = alvo - time.perf_counter()
+            if restante <= 0: return
+            await asyncio.sleep(restante - MARGEM_ESPERA_ATIVA if restante > 2 * MARGEM_ESPERA_ATIVA else 0)
+
+    async def _finalizar_tarefas(self):
+        tarefas = [tarefa for tarefa in asyncio.all_tasks(self.loop) if tarefa is not asyncio.current_task()]
+        for tarefa in tarefas: tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+    def encerrar(self, timeout=ENCERRAMENTO_MOTOR_SEGUNDOS):
+        if self.loop.is_running():
+            try: asyncio.run_coroutine_threadsafe(self._finalizar_tarefas(), self.loop).result(timeout)
+            except Exception: pass
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
 
 def get_direction(candle, use_doji_filter=False, doji_sensitivity_percent=5.0):
     if use_doji_filter:
@@ -200,6 +1249,127 @@ def get_direction(candle, use_doji_filter=False, doji_sensitivity_percent=5.0):
     else:
         return 'doji'
 
+def direcoes_velas(velas, use_doji_filter=False, doji_sensitivity_percent=5.0):
+    if not isinstance(velas, SerieVelas): velas = SerieVelas.de_velas(velas)
+    abertura, fechamento = velas.open, velas.close
+    direcoes = np.sign(fechamento - abertura).astype(np.int8)
+    if use_doji_filter:
+        corpo = np.abs(fechamento - abertura)
+        amplitude = velas.max - velas.min
+        with np.errstate(divide='ignore', invalid='ignore'):
+            doji = (amplitude == 0) | ((corpo / amplitude) * 100 < doji_sensitivity_percent)
+        direcoes[doji] = 0
+    return direcoes
+
+def maior_sequencia(direcoes):
+    validas = direcoes[direcoes != 0]
+    if not len(validas): return 0
+    limites = np.concatenate(([0], np.flatnonzero(validas[1:] != validas[:-1]) + 1, [len(validas)]))
+    return int(np.diff(limites).max())
+
+def estatisticas_mhi(direcoes, mg_niveis, qtd_loss_seguidos_analise):
+    velas_resultado = 1 + mg_niveis
+    primeiro = len(direcoes) - (5 + velas_resultado)
+    if primeiro < 0:
+        return {'wins': [0] * velas_resultado, 'loss': 0, 'total': 0, 'oportunidades_pos_loss': 0, 'wins_pos_loss': 0}
+    inicios = np.arange(primeiro % 5, primeiro + 1, 5)
+    quadrantes = direcoes[inicios[0]:inicios[-1] + 5].reshape(-1, 5)
+    resultados = direcoes[(inicios + 5)[:, None] + np.arange(velas_resultado)]
+
+    ultimas_tres = quadrantes[:, 2:]
+    validos = np.all(ultimas_tres != 0, axis=1)
+    entrada = -np.sign(ultimas_tres.sum(axis=1, dtype=np.int16))
+    return estatisticas_ciclos(entrada, resultados, validos, qtd_loss_seguidos_analise)
+
+def estatisticas_r2(sinais, direcoes, mg_niveis, qtd_loss_seguidos_analise):
+    velas_resultado = 1 + mg_niveis
+    indices = np.flatnonzero(sinais)
+    indices = indices[indices + velas_resultado <= len(direcoes)]
+    resultados = direcoes[indices[:, None] + np.arange(velas_resultado)]
+    return estatisticas_ciclos(sinais[indices], resultados, np.ones(len(indices), dtype=bool), qtd_loss_seguidos_analise)
+
+def estatisticas_ciclos(entrada, resultados, validos, qtd_loss_seguidos_analise):
+    return estatisticas_codigos(codificar_ciclos(entrada, resultados, validos), resultados.shape[1], qtd_loss_seguidos_analise)
+
+def codificar_ciclos(entrada, resultados, validos):
+    acertos = resultados == entrada[:, None]
+    nivel = np.argmax(acertos | (resultados == 0), axis=1)
+    venceu = validos & acertos[np.arange(len(entrada)), nivel]
+    return np.where(venceu, nivel, np.where(validos, CICLO_LOSS, CICLO_INVALIDO)).astype(np.int8)
+
+def estatisticas_codigos(codigos, velas_resultado, qtd_loss_seguidos_analise, operados=None):
+    validos = codigos != CICLO_INVALIDO
+    perdeu = codigos == CICLO_LOSS
+
+    indices = np.arange(len(perdeu))
+    seguidos = indices - np.maximum.accumulate(np.where(perdeu, -1, indices))
+    if qtd_loss_seguidos_analise > 0: gatilhos = perdeu & (seguidos % qtd_loss_seguidos_analise == 0)
+    elif qtd_loss_seguidos_analise == 0: gatilhos = ~perdeu
+    else: gatilhos = np.zeros(len(perdeu), dtype=bool)
+    proximos = np.flatnonzero(gatilhos) + 1
+    proximos = proximos[proximos < len(perdeu)]
+    proximos = proximos[validos[proximos]]
+    if operados is not None:
+        proximos = proximos[operados[proximos]]
+        validos = validos & operados
+    venceu = validos & (codigos >= 0)
+    win_primeira = venceu & (codigos == 0)
+
+    return {
+        'wins': np.bincount(codigos[venceu], minlength=velas_resultado).tolist(),
+        'loss': int((perdeu & validos).sum()),
+        'total': int(validos.sum()),
+        'oportunidades_pos_loss': len(proximos),
+        'wins_pos_loss': int(win_primeira[proximos].sum())
+    }
+
+def sinais_r2(abertura, fechamento, rsi_compra=R2_RSI_COMPRA, rsi_venda=R2_RSI_VENDA):
+    return sinais_indicadores_r2(*indicadores_r2(abertura, fechamento), rsi_compra, rsi_venda)
+
+def sinais_indicadores_r2(rsi, tendencia, rsi_compra=R2_RSI_COMPRA, rsi_venda=R2_RSI_VENDA):
+    with np.errstate(invalid='ignore'):
+        call = (rsi < rsi_compra) & (tendencia >= 0)
+        put = (rsi > rsi_venda) & (tendencia <= 0)
+    return np.where(call, 1, np.where(put, -1, 0)).astype(np.int8)
+
+def indicadores_r2(abertura, fechamento):
+    janela = R2_EMA_PERIODO * 3
+    rsi_todos = np.full(len(fechamento), np.nan)
+    tendencia = np.zeros(len(fechamento), dtype=np.int8)
+    if len(fechamento) < janela: return rsi_todos, tendencia
+    janelas = np.lib.stride_tricks.sliding_window_view(np.asarray(fechamento, dtype=np.float64), janela).copy()
+    preco_atual = np.asarray(abertura, dtype=np.float64)[janela - 1:]
+    janelas[:, -1] = preco_atual
+    ema, ema_ultimos_5 = calcular_ema_lote(janelas, R2_EMA_PERIODO)
+    rsi = calcular_rsi_lote(janelas, R2_RSI_PERIODO)
+    validos = (ema != 0) & (rsi != 0) & ~np.isnan(ema) & ~np.isnan(rsi)
+    lateral = np.std(ema_ultimos_5, axis=1) < (preco_atual * R2_LATERAL_FATOR)
+    rsi_todos[janela - 1:] = np.where(validos, rsi, np.nan)
+    tendencia[janela - 1:] = np.where(lateral, 0, np.where(preco_atual > ema, 1, -1))
+    return rsi_todos, tendencia
+
+def contar_velas_consecutivas(candles, use_doji_filter=False):
+    if not candles: return 0
+    last_direction = None
+    count = 0
+    for candle in reversed(list(candles)):
+        direction = get_direction(candle, use_doji_filter=use_doji_filter)
+        if direction == 'doji': continue
+        if last_direction is None:
+            last_direction = direction
+            count = 1
+        elif direction == last_direction: count += 1
+        else: break
+    return count
+
+def velas_necessarias_mhi(mg_nivel_max):
+    return 5 + (1 + mg_nivel_max) + 5 + 15
+
+def descrever_lacunas(velas, inicio, tamanho=5, interval=60):
+    lacunas = velas.lacunas(inicio, inicio + tamanho * interval, interval)
+    if not lacunas: return ""
+    return " (faltando " + ", ".join(datetime.datetime.fromtimestamp(ts).strftime('%H:%M') for ts in lacunas) + ")"
+
 def traduzir_erro(reason):
     if isinstance(reason, dict):
         code = reason.get("code", "")
@@ -238,127 +1408,187 @@ class PowerBossRobot:
         self.consecutive_losses = {}
         self.apto_para_operar = {}
         self.last_analysis_time = {ativo: None for ativo in config.get('ativos', [])}
+        self.indicadores = {}
+        self._locks_indicadores = {}
         self.stats_lock = threading.Lock()
+        self.executor_coleta = ThreadPoolExecutor(max_workers=config.get('workers_coleta', MAX_WORKERS_COLETA), thread_name_prefix="coleta")
+        self.executor_ciclos = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ciclos")
+        self.ciclos_perdidos = 0
+        self.motor = MotorEntradas(config.get('workers_corretora', MAX_WORKERS_CORRETORA), self.agora)
+        self.posicoes = asyncio.Semaphore(max(1, config.get('max_posicoes', MAX_POSICOES_ABERTAS)))
+        self.entradas_descartadas = 0
+        self.entradas_atrasadas = []
+        self.latencias = MedidorLatencia(config.get('janela_latencia', JANELA_LATENCIA))
+
+    def agora(self):
+        relogio = getattr(self.api, 'relogio', None)
+        return relogio.agora() if relogio else time.time()
 
     def get_candles(self, ativo, n=10, size=60, end_time=None):
         try:
-            end_time = end_time or time.time()
+            end_time = end_time or self.agora()
             return self.api.get_candles(ativo, size, n, end_time)
         except Exception:
-            return []
+            return SerieVelas()
 
-    def buy_and_check(self, ativo, valor, direcao, exp):
-        if self.sound_callback: self.sound_callback("entry")
+    async def buy_and_check(self, ativo, valor, direcao, exp, marcas=None):
+        if self.sound_callback: self.motor.loop.run_in_executor(None, self.sound_callback, "entry")
         if not self.api or not self.api.connected:
             self.log(f"Operação cancelada em {ativo}: API desconectada.", "#FF4040")
             return None, 0.0
+        order_id = None
+        marcas = dict(marcas or {})
         try:
-            _, order_id = self.api.buy(valor, ativo, direcao, exp)
+            marcas['envio'] = self.agora()
+            _, order_id = await self.motor.chamar(self.api.buy, valor, ativo, direcao, exp)
+            marcas['ordem'] = self.agora()
             if not order_id:
                 self.log(f"Falha ao enviar ordem para {ativo}. A corretora não retornou um ID.", "#FF4040")
                 return None, 0.0
-            max_wait = 120
-            check_interval = 0.5
-            max_checks = int(max_wait / check_interval)
-            for i in range(max_checks):
+            max_wait = max(120, exp * 60 + 60)
+            resultado = asyncio.wrap_future(self.api.aguardar_resultado(order_id, exp))
+            limite = time.monotonic() + max_wait
+            while time.monotonic() < limite:
                 if self.stop_event.is_set():
+                    self.api.descartar_resultado(order_id)
                     self.log("Verificação de resultado cancelada pelo usuário.", "#FF8000")
                     return None, 0.0
-                try: status, lucro = self.api.check_win_v4(order_id)
-                except Exception as e:
-                    self.log(f"Erro ao verificar resultado da ordem: {e}. Tentando novamente...", "#FF8000")
-                    time.sleep(check_interval)
-                    continue
-                if status is not None:
-                    if self.update_saldo_callback: self.update_saldo_callback()
-                    if status == 'win' or status is True:
-                        if self.sound_callback: self.sound_callback("win")
-                        return True, lucro
-                    elif status == 'loose' or status is False:
-                        if self.sound_callback: self.sound_callback("loss")
-                        return False, lucro
-                    elif status == 'equal': return None, lucro
-                    else:
-                        self.log(f"Status desconhecido retornado: {status}. Finalizando checagem.", "#FF8000")
-                        return None, lucro
-                time.sleep(check_interval)
+                concluidos, _ = await asyncio.wait({resultado}, timeout=min(1.0, max(0.0, limite - time.monotonic())))
+                if concluidos:
+                    marcas['resultado'] = self.agora()
+                    self.latencias.registrar(ativo, marcas)
+                    status, lucro = resultado.result()
+                    tratado = self._tratar_resultado(status, lucro)
+                    self.motor.loop.run_in_executor(None, self._efeitos_resultado, tratado[0])
+                    return tratado
+            self.api.descartar_resultado(order_id)
             self.log(f"Timeout ao obter resultado da ordem {order_id} em {ativo}!", "#FF4040")
             return None, 0.0
+        except asyncio.CancelledError:
+            if order_id: self.api.descartar_resultado(order_id)
+            self.log("Verificação de resultado cancelada pelo usuário.", "#FF8000")
+            raise
         except Exception as e:
             self.log(f"Erro crítico na função de compra: {e}", "#FF4040")
             return None, 0.0
 
-    def get_consecutive_candles_count(self, ativo):
-        candles = self.get_candles(ativo, n=10, size=60)
-        if not candles: return 0
-        last_direction = None
-        count = 0
-        for candle in reversed(candles):
-            direction = get_direction(candle, use_doji_filter=self.config.get("doji_filter", False))
-            if direction == 'doji': continue
-            if last_direction is None:
-                last_direction = direction
-                count = 1
-            elif direction == last_direction: count += 1
-            else: break
-        return count
-
-    def executar_entrada_thread(self, ativo, direcao_entrada_real, mg_nivel_max, prox_soros_inicial):
+    def _tratar_resultado(self, status, lucro):
+        if status == 'win' or status is True:
+            return True, lucro
+        elif status == 'loose' or status is False:
+            return False, lucro
+        elif status == 'equal': return None, lucro
+        else:
+            self.log(f"Status desconhecido retornado: {status}. Finalizando checagem.", "#FF8000")
+            return None, lucro
+
+    def _efeitos_resultado(self, resultado):
+        if self.update_saldo_callback: self.update_saldo_callback()
+        if self.sound_callback and resultado is not None: self.sound_callback("win" if resultado else "loss")
+
+    async def _preparar_martingale(self, ativo, valor_atual):
+        try: aberto = await self.motor.chamar(self.api.ativo_aberto, ativo)
+        except Exception: aberto = True
+        return {'valor': valor_atual * 2, 'aberto': aberto}
+
+    def coletar_dados(self, ativos, funcao, *args):
+        futuros = {ativo: self.executor_coleta.submit(funcao, ativo, *args) for ativo in ativos}
+        dados = {}
+        for ativo, futuro in futuros.items():
+            try: dados[ativo] = futuro.result()
+            except Exception: dados[ativo] = None
+        return dados
+
+    def _coletar_mhi(self, ativo, n, end_time):
+        velas = self.get_candles(ativo, n=max(n, 16), size=60, end_time=end_time)
+        dados = {'velas': velas}
+        if self.config.get("filtro_velas_consecutivas", False):
+            dados['velas_consecutivas'] = contar_velas_consecutivas(velas[-10:], use_doji_filter=self.config.get("doji_filter", False))
+        return dados
+
+    def _coletar_r2(self, ativo, end_time):
+        with self._locks_indicadores.setdefault(ativo, threading.Lock()):
+            minuto_atual = int(end_time) // 60 * 60
+            estado = self.indicadores.get(ativo)
+            n_semente = 21 * 3 + 1
+            if estado is None or estado.ultimo_from is None or (minuto_atual - estado.ultimo_from) // 60 >= n_semente:
+                estado = IndicadoresAtivo()
+                n = n_semente
+            else:
+                n = int(minuto_atual - estado.ultimo_from) // 60 + 1
+            velas = self.get_candles(ativo, n=n, size=60, end_time=end_time)
+            if not velas: return None
+            self.indicadores[ativo] = estado
+            n_fechadas = int(np.searchsorted(velas.from_, minuto_atual))
+            estado.semear(velas[:n_fechadas])
+            return estado.valores(velas[-1] if n_fechadas < len(velas) else None)
+
+    async def executar_entrada(self, ativo, direcao_entrada_real, mg_nivel_max, prox_soros_inicial, marcas=None):
         mg_nivel = 0
         valor_base = self.config['valor']
         prox_soros = prox_soros_inicial
         valor_entrada = prox_soros if self.config.get('soros', 0) > 0 and prox_soros is not None else valor_base
         
-        while mg_nivel <= mg_nivel_max and not self.stop_event.is_set():
-            if self.verificar_condicoes_parada():
-                self.stop_event.set()
-                break
+        seguinte = None
+        try:
+            while mg_nivel <= mg_nivel_max and not self.stop_event.is_set():
+                if self.verificar_condicoes_parada():
+                    self.stop_event.set()
+                    break
 
-            if mg_nivel > 0: valor_entrada *= 2
+                if mg_nivel > 0:
+                    preparo = await seguinte
+                    if not preparo['aberto']:
+                        self.log(f"Martingale cancelado em {ativo}: ativo fechado para negociação.", "#FF8000")
+                        break
+                    valor_entrada = preparo['valor']
+                seguinte = asyncio.ensure_future(self._preparar_martingale(ativo, valor_entrada)) if mg_nivel < mg_nivel_max else None
             
-            with self.stats_lock:
-                self.result_stats['ops'] += 1
-                self.entradas_realizadas += 1
-                self.stats_callback(self._stats())
+                with self.stats_lock:
+                    self.result_stats['ops'] += 1
+                    self.entradas_realizadas += 1
+                    self.stats_callback(self._stats())
             
-            labelmg = "" if mg_nivel == 0 else f"(MG{mg_nivel})"
-            self.log(f"Entrando em {ativo} | {direcao_entrada_real.upper()} {labelmg} | Valor: {valor_entrada:.2f}", "#00FFFF")
+                labelmg = "" if mg_nivel == 0 else f"(MG{mg_nivel})"
+                self.log(f"Entrando em {ativo} | {direcao_entrada_real.upper()} {labelmg} | Valor: {valor_entrada:.2f}", "#00FFFF")
 
-            resultado, lucro_op = self.buy_and_check(ativo, valor_entrada, direcao_entrada_real, self.config['expiracao'])
+                resultado, lucro_op = await self.buy_and_check(ativo, valor_entrada, direcao_entrada_real, self.config['expiracao'], marcas if mg_nivel == 0 else None)
 
-            with self.stats_lock:
-                self.lucro_acumulado += lucro_op
-                self.lucro_callback(self.lucro_acumulado)
+                with self.stats_lock:
+                    self.lucro_acumulado += lucro_op
+                    self.lucro_callback(self.lucro_acumulado)
 
-                if resultado is None:
-                    self.log(f"EMPATE em {ativo}. Valor devolvido.", "#FFD700")
-                    prox_soros = None
-                    break
-                elif resultado is True:
-                    self.result_stats['wins'] += 1
-                    self.log(f"WIN em {ativo} {labelmg} | Lucro: {lucro_op:.2f}", "#2DC937")
-                    if self.config.get('soros', 0) > 0 and (self.config.get('soros_em_mg', False) or mg_nivel == 0):
-                        prox_soros = valor_base + (lucro_op * (self.config.get('soros', 0) / 100))
-                    if self.config.get('filtro_loss_seguidos', False) and self.config.get('esperar_novo_loss', False):
-                        self.apto_para_operar[ativo] = False
-                        self.consecutive_losses[ativo] = 0
-                        self.log(f"WIN! O ativo {ativo} aguardará um novo ciclo de loss.", "#FFA500")
-                    break
-                else: # Loss
-                    self.result_stats['losses'] += 1
-                    if mg_nivel < mg_nivel_max:
-                        self.log(f"LOSS em {ativo} | Indo para Martingale {mg_nivel+1}", "#FF8000")
-                        mg_nivel += 1
-                    else:
-                        self.log(f"LOSS em {ativo} {labelmg} | Perda: {lucro_op:.2f}", "#FF4040")
+                    if resultado is None:
+                        self.log(f"EMPATE em {ativo}. Valor devolvido.", "#FFD700")
                         prox_soros = None
-                        if self.config.get('filtro_loss_seguidos', False):
+                        break
+                    elif resultado is True:
+                        self.result_stats['wins'] += 1
+                        self.log(f"WIN em {ativo} {labelmg} | Lucro: {lucro_op:.2f}", "#2DC937")
+                        if self.config.get('soros', 0) > 0 and (self.config.get('soros_em_mg', False) or mg_nivel == 0):
+                            prox_soros = valor_base + (lucro_op * (self.config.get('soros', 0) / 100))
+                        if self.config.get('filtro_loss_seguidos', False) and self.config.get('esperar_novo_loss', False):
+                            self.apto_para_operar[ativo] = False
                             self.consecutive_losses[ativo] = 0
-                            if self.config.get('esperar_novo_loss', False):
-                                self.apto_para_operar[ativo] = False
-                                self.log(f"LOSS no ciclo! O ativo {ativo} aguardará um novo ciclo de loss.", "#FF4040")
+                            self.log(f"WIN! O ativo {ativo} aguardará um novo ciclo de loss.", "#FFA500")
                         break
-                self.stats_callback(self._stats())
+                    else: # Loss
+                        self.result_stats['losses'] += 1
+                        self.stats_callback(self._stats())
+                        if mg_nivel < mg_nivel_max:
+                            self.log(f"LOSS em {ativo} | Indo para Martingale {mg_nivel+1}", "#FF8000")
+                            mg_nivel += 1
+                        else:
+                            self.log(f"LOSS em {ativo} {labelmg} | Perda: {lucro_op:.2f}", "#FF4040")
+                            prox_soros = None
+                            if self.config.get('filtro_loss_seguidos', False):
+                                self.consecutive_losses[ativo] = 0
+                                if self.config.get('esperar_novo_loss', False):
+                                    self.apto_para_operar[ativo] = False
+                                    self.log(f"LOSS no ciclo! O ativo {ativo} aguardará um novo ciclo de loss.", "#FF4040")
+                            break
+        finally:
+            if seguinte is not None and not seguinte.done(): seguinte.cancel()
 
     def run_mhi(self, agora, mg_nivel_max):
         horario_base_ciclo = agora.replace(second=0, microsecond=0)
@@ -379,29 +1609,32 @@ class PowerBossRobot:
         qtd_loss_necessarios = self.config.get('qtd_loss_seguidos', 1)
         esperar_novo_loss_apos_win = self.config.get('esperar_novo_loss', False)
 
-        for ativo in list(self.config['ativos']):
-            velas_resultado_necessarias = 1 + mg_nivel_max
-            velas_necessarias_api = 5 + velas_resultado_necessarias + 5 + 15
-            all_candles = self.get_candles(ativo, n=velas_necessarias_api, size=60, end_time=horario_base_ciclo.timestamp())
+        velas_resultado_necessarias = 1 + mg_nivel_max
+        ativos = list(self.config['ativos'])
+        dados_ativos = self.coletar_dados(ativos, self._coletar_mhi, velas_necessarias_mhi(mg_nivel_max), horario_base_ciclo.timestamp())
+        if self.config.get("adx", False):
+            series = [(dados_ativos.get(ativo) or {}).get('velas') for ativo in ativos]
+            closes, highs, lows = empilhar_janelas(series, 16)
+            for ativo, adx_val in zip(ativos, calcular_adx_lote(highs, lows, closes, 14)):
+                if dados_ativos.get(ativo): dados_ativos[ativo]['adx'] = None if np.isnan(adx_val) else float(adx_val)
+
+        for ativo in ativos:
+            dados = dados_ativos.get(ativo) or {}
+            all_candles = dados.get('velas')
             if not all_candles:
                 self.log(f"Não foi possível obter velas para {ativo}.", "#FF8000")
                 continue
 
-            def extrair_quadrante_preciso(timestamp_inicio_quadrante, todas_as_velas):
-                timestamp_fim_quadrante = timestamp_inicio_quadrante + (5 * 60)
-                quadrante = [c for c in todas_as_velas if c['from'] >= timestamp_inicio_quadrante and c['from'] < timestamp_fim_quadrante]
-                return quadrante if len(quadrante) == 5 else None
-
             if filtro_loss_ativo and not self.apto_para_operar.get(ativo):
                 ts_inicio_resultado_loss = int((horario_base_ciclo - datetime.timedelta(minutes=5)).timestamp())
                 ts_inicio_analise_loss = int((horario_base_ciclo - datetime.timedelta(minutes=10)).timestamp())
-                q_analise_loss = extrair_quadrante_preciso(ts_inicio_analise_loss, all_candles)
+                q_analise_loss = all_candles.quadrante(ts_inicio_analise_loss)
                 
                 if not q_analise_loss:
-                    self.log(f"Dados do quadrante de análise de loss para {ativo} incompletos. Pulando.", "#FF8000")
+                    self.log(f"Dados do quadrante de análise de loss para {ativo} incompletos{descrever_lacunas(all_candles, ts_inicio_analise_loss)}. Pulando.", "#FF8000")
                     continue
                 
-                velas_de_resultado = [c for c in all_candles if c['from'] >= ts_inicio_resultado_loss]
+                velas_de_resultado = all_candles.a_partir_de(ts_inicio_resultado_loss)
                 if len(velas_de_resultado) < velas_resultado_necessarias:
                     self.log(f"Dados das velas de resultado de loss para {ativo} incompletos. Pulando.", "#FF8000")
                     continue
@@ -430,10 +1663,10 @@ class PowerBossRobot:
                 continue
             
             ts_inicio_analise_entrada = int((horario_base_ciclo - datetime.timedelta(minutes=5)).timestamp())
-            quadrante_atual = extrair_quadrante_preciso(ts_inicio_analise_entrada, all_candles)
+            quadrante_atual = all_candles.quadrante(ts_inicio_analise_entrada)
 
             if not quadrante_atual:
-                self.log(f"Dados do quadrante de ENTRADA para {ativo} incompletos. Pulando.", "#FF8000")
+                self.log(f"Dados do quadrante de ENTRADA para {ativo} incompletos{descrever_lacunas(all_candles, ts_inicio_analise_entrada)}. Pulando.", "#FF8000")
                 continue
 
             ultimas_tres_atuais = quadrante_atual[2:5]
@@ -445,18 +1678,34 @@ class PowerBossRobot:
 
             direcao_entrada_real = 'put' if directions_atuais.count('call') > directions_atuais.count('put') else 'call'
 
-            if self.config.get("filtro_velas_consecutivas", False) and self.get_consecutive_candles_count(ativo) >= 4:
+            if self.config.get("filtro_velas_consecutivas", False) and dados.get('velas_consecutivas', 0) >= 4:
                 self.log(f"Entrada BLOQUEADA em {ativo} (filtro de velas).", "#FFA500"); continue
             if self.config.get("adx", False):
-                adx_val = self.api.get_adx(ativo)
+                adx_val = dados.get('adx')
                 if adx_val is not None and adx_val >= 21:
                     self.log(f"Entrada BLOQUEADA em {ativo} (ADX >= 21).", "#FFA500"); continue
             
             self.log(f"Análise MHI {ativo}: {directions_atuais} -> SINAL para MINORIA: {direcao_entrada_real.upper()}", "#00FFFF")
             entradas_para_executar.append({'ativo': ativo, 'direcao': direcao_entrada_real, 'prox_soros': None})
         
-        self.executar_lista_de_entradas(entradas_para_executar, mg_nivel_max)
+        self.executar_lista_de_entradas(entradas_para_executar, mg_nivel_max, horario_base_ciclo.timestamp())
     
+    def prefetch_ciclo(self, agora, estrategia, mg_nivel_max):
+        minuto = agora.replace(second=0, microsecond=0)
+        if self.last_analysis_time.get('prefetch') == minuto:
+            return
+        self.last_analysis_time['prefetch'] = minuto
+        threading.Thread(target=self._prefetch_thread, args=(list(self.config['ativos']), estrategia, mg_nivel_max, agora.timestamp()), daemon=True).start()
+
+    def _prefetch_thread(self, ativos, estrategia, mg_nivel_max, end_time):
+        try:
+            if estrategia == 'MHI':
+                self.coletar_dados(ativos, self._coletar_mhi, velas_necessarias_mhi(mg_nivel_max), end_time)
+            else:
+                self.coletar_dados(ativos, self._coletar_r2, end_time)
+        except RuntimeError:
+            pass
+
     def run_r2(self, agora, mg_nivel_max):
         horario_base_ciclo = agora.replace(microsecond=0)
         log_detalhado = self.config.get("r2_detailed_log", False)
@@ -472,19 +1721,23 @@ class PowerBossRobot:
 
         entradas_para_executar = []
 
-        for ativo in list(self.config['ativos']):
-            ema_val, ema_ultimos_5 = self.api.get_ema(ativo, period=21)
-            rsi_val = self.api.get_rsi(ativo, period=2)
-            
-            last_candle = self.get_candles(ativo, n=1, size=60, end_time=horario_base_ciclo.timestamp())
+        ativos = list(self.config['ativos'])
+        dados_ativos = self.coletar_dados(ativos, self._coletar_r2, horario_base_ciclo.timestamp())
+
+        for ativo in ativos:
+            indicadores = dados_ativos.get(ativo) or {}
+            ema_val = indicadores.get('ema')
+            ema_ultimos_5 = indicadores.get('ema_ultimos_5')
+            rsi_val = indicadores.get('rsi')
+            last_candle = indicadores.get('ultima_vela')
             if not ema_val or not rsi_val or not last_candle:
                 if log_detalhado: self.log(f"Não foi possível obter indicadores para {ativo}.", "#FF8000")
                 continue
             
-            preco_atual = last_candle[0]['close']
+            preco_atual = last_candle['close']
 
             tendencia = None
-            if np.std(ema_ultimos_5) < (preco_atual * 0.0001):
+            if np.std(ema_ultimos_5) < (preco_atual * R2_LATERAL_FATOR):
                 tendencia = 'lateral'
                 tendencia_str = 'LATERAL'
             elif preco_atual > ema_val:
@@ -495,9 +1748,9 @@ class PowerBossRobot:
                 tendencia_str = f"BAIXA (Preço {preco_atual:.5f} < EMA {ema_val:.5f})"
             
             sinal_rsi = None
-            if rsi_val < 15:
+            if rsi_val < R2_RSI_COMPRA:
                 sinal_rsi = 'call'
-            elif rsi_val > 85:
+            elif rsi_val > R2_RSI_VENDA:
                 sinal_rsi = 'put'
 
             if log_detalhado and not sinal_rsi:
@@ -521,15 +1774,58 @@ class PowerBossRobot:
             self.log(f"Análise R2 {ativo}: SINAL CONFIRMADO para {direcao_entrada_real.upper()}", "#2DC937")
             entradas_para_executar.append({'ativo': ativo, 'direcao': direcao_entrada_real, 'prox_soros': None})
 
-        self.executar_lista_de_entradas(entradas_para_executar, mg_nivel_max)
-
-    def executar_lista_de_entradas(self, entradas, mg_nivel_max):
+        self.executar_lista_de_entradas(entradas_para_executar, mg_nivel_max, horario_base_ciclo.replace(second=0).timestamp())
+
+    def executar_lista_de_entradas(self, entradas, mg_nivel_max, inicio_vela=None):
+        if inicio_vela is None:
+            agora = self.agora()
+            inicio_vela = agora - agora % 60
+        disparo = inicio_vela + self.config.get('atraso_entrada', ATRASO_ENTRADA_SEGUNDOS)
+        prazo = inicio_vela + self.config.get('prazo_entrada', PRAZO_ENTRADA_SEGUNDOS)
+        marcas = {'vela': inicio_vela, 'sinal': self.agora()}
+        if entradas:
+            self.log(f"{len(entradas)} entrada(s) armada(s) para {datetime.datetime.fromtimestamp(disparo).strftime('%H:%M:%S.%f')[:-3]}.", "#00BFFF")
         if self.config.get("entradas_simultaneas", True):
             for entrada in entradas:
-                threading.Thread(target=self.executar_entrada_thread, args=(entrada['ativo'], entrada['direcao'], mg_nivel_max, entrada['prox_soros']), daemon=True).start()
+                self.agendar_entrada(entrada, mg_nivel_max, disparo, prazo, marcas)
         elif entradas:
-            entrada = entradas[0]
-            self.executar_entrada_thread(entrada['ativo'], entrada['direcao'], mg_nivel_max, entrada['prox_soros'])
+            try: self.agendar_entrada(entradas[0], mg_nivel_max, disparo, prazo, marcas).result()
+            except Exception: pass
+
+    def agendar_entrada(self, entrada, mg_nivel_max, disparo, prazo, marcas=None):
+        futuro = self.motor.agendar(self.executar_entrada_limitada(entrada, mg_nivel_max, disparo, prazo, marcas))
+        futuro.add_done_callback(lambda f, ativo=entrada['ativo']: self._entrada_finalizada(f, ativo))
+        return futuro
+
+    async def executar_entrada_limitada(self, entrada, mg_nivel_max, disparo, prazo, marcas=None):
+        ativo = entrada['ativo']
+        await self.motor.aguardar_ate(disparo)
+        atraso = self.agora() - disparo
+        if atraso > self.config.get('orcamento_latencia', ORCAMENTO_LATENCIA_SEGUNDOS):
+            with self.stats_lock: self.entradas_atrasadas.append({'ativo': ativo, 'disparo': disparo, 'atraso': atraso})
+            self.log(f"Entrada em {ativo} ignorada: {atraso:.3f}s de atraso excede o orçamento de latência.", "#FF8000")
+            return
+        if self.posicoes.locked():
+            restante = prazo - self.agora()
+            self.log(f"Limite de posições abertas atingido. {ativo} aguardando vaga por até {max(0.0, restante):.1f}s.", "#FFA500")
+            try:
+                if restante <= 0: raise asyncio.TimeoutError
+                await asyncio.wait_for(self.posicoes.acquire(), restante)
+            except asyncio.TimeoutError:
+                with self.stats_lock: self.entradas_descartadas += 1
+                self.log(f"Entrada em {ativo} descartada: sem vaga antes do prazo de entrada.", "#FF8000")
+                return
+        else:
+            await self.posicoes.acquire()
+        try:
+            await self.executar_entrada(ativo, entrada['direcao'], mg_nivel_max, entrada['prox_soros'], marcas)
+        finally:
+            self.posicoes.release()
+
+    def _entrada_finalizada(self, futuro, ativo):
+        if futuro.cancelled(): return
+        erro = futuro.exception()
+        if erro: self.log(f"Erro na execução da entrada em {ativo}: {erro}", "#FF4040")
 
     def run(self):
         ativos = list(self.config['ativos'])
@@ -540,6 +1836,8 @@ class PowerBossRobot:
 
         self.lucro_acumulado = 0.0
         self.entradas_realizadas = 0
+        self.entradas_descartadas = 0
+        self.entradas_atrasadas = []
         self.result_stats = {'ops': 0, 'wins': 0, 'losses': 0}
         self.lucro_callback(self.lucro_acumulado)
         self.stats_callback({'ops': 0, 'wins': 0, 'losses': 0, 'taxa': "0%"})
@@ -552,6 +1850,10 @@ class PowerBossRobot:
         estrategia = self.config.get('strategy', 'MHI')
         self.log(f"Estratégia selecionada: {estrategia}", "#00BFFF")
         self.last_analysis_time = {}
+        self.indicadores = {}
+
+        if self.config.get('stream_velas', False):
+            self.iniciar_streams(ativos)
 
         if estrategia == 'MHI':
             filtro_loss_ativo = self.config.get('filtro_loss_seguidos', False)
@@ -560,23 +1862,69 @@ class PowerBossRobot:
             if filtro_loss_ativo:
                 self.log(f"Filtro de Loss (MHI) ativado. Aguardando {self.config.get('qtd_loss_seguidos', 1)} loss seguidos.", "#FFA500")
 
+        periodo = 300 if estrategia == 'MHI' else 60
+        proximo = (int(self.agora()) // periodo + 1) * periodo
+        self.ciclos_perdidos = 0
+        ciclo_atual = None
         while not self.stop_event.is_set():
-            agora = datetime.datetime.now()
-
-            if agora.second == 1:
-                if estrategia == 'MHI':
-                    if agora.minute % 5 == 0:
-                        self.run_mhi(agora, mg_nivel_max)
-                elif estrategia == 'R2':
-                    self.run_r2(agora, mg_nivel_max)
-            
-            time.sleep(1)
+            prefetch_em = proximo - (60 - PREFETCH_SEGUNDO)
+            ciclo_em = proximo + CICLO_SEGUNDO
+            if self.agora() < prefetch_em and self._aguardar_ate(prefetch_em):
+                self.prefetch_ciclo(datetime.datetime.fromtimestamp(prefetch_em), estrategia, mg_nivel_max)
+            if not self._aguardar_ate(ciclo_em):
+                break
+
+            atraso = self.agora() - ciclo_em
+            if atraso > TOLERANCIA_CICLO_SEGUNDOS:
+                perdidos = int((atraso - TOLERANCIA_CICLO_SEGUNDOS) // periodo) + 1
+                self.ciclos_perdidos += perdidos
+                self.log(f"{perdidos} ciclo(s) perdido(s) a partir de {datetime.datetime.fromtimestamp(ciclo_em).strftime('%H:%M:%S')} (atraso de {atraso:.1f}s).", "#FF4040")
+                proximo += perdidos * periodo
+                continue
+            if ciclo_atual is not None and not ciclo_atual.done():
+                self.ciclos_perdidos += 1
+                self.log(f"Ciclo das {datetime.datetime.fromtimestamp(ciclo_em).strftime('%H:%M:%S')} perdido: o ciclo anterior ainda está em execução.", "#FF4040")
+            else:
+                ciclo_atual = self.executor_ciclos.submit(self._executar_ciclo, estrategia, datetime.datetime.fromtimestamp(ciclo_em), mg_nivel_max)
+            proximo += periodo
+
+        if self.config.get('stream_velas', False):
+            self.parar_streams(ativos)
+        self.executor_ciclos.shutdown(wait=False)
+        self.executor_coleta.shutdown(wait=False)
+        self.motor.encerrar()
         
         if self.stop_event.is_set() and not self.verificar_condicoes_parada():
             self.log("Robô finalizado pelo usuário.", "#FFA500")
         
         if self.finish_callback: self.finish_callback()
 
+    def _aguardar_ate(self, instante):
+        while not self.stop_event.is_set():
+            restante = instante - self.agora()
+            if restante <= 0: return True
+            self.stop_event.wait(min(restante, ESPERA_MAXIMA_SEGUNDOS))
+        return False
+
+    def _executar_ciclo(self, estrategia, agora, mg_nivel_max):
+        try:
+            if estrategia == 'MHI':
+                self.run_mhi(agora, mg_nivel_max)
+            elif estrategia == 'R2':
+                self.run_r2(agora, mg_nivel_max)
+        except Exception as e:
+            self.log(f"Erro no ciclo de análise: {e}", "#FF4040")
+
+    def iniciar_streams(self, ativos):
+        for ativo in ativos:
+            try: self.api.start_candles_stream(ativo, 60, CANDLE_STREAM_SIZE)
+            except Exception as e: self.log(f"Não foi possível iniciar o stream de velas de {ativo}: {e}", "#FF8000")
+        self.log(f"Stream de velas em tempo real ativo para {len(ativos)} ativo(s).", "#00BFFF")
+
+    def parar_streams(self, ativos):
+        for ativo in ativos:
+            self.api.stop_candles_stream(ativo, 60)
+
     def verificar_condicoes_parada(self):
         if self.config['stop_lucro']:
             alvo_lucro = self.config.get('lucro', 0.0)
@@ -598,10 +1946,25 @@ class PowerBossRobot:
         ops = self.result_stats['ops']
         wins = self.result_stats['wins']
         taxa = (wins / ops * 100) if ops else 0
-        return {'ops': ops, 'wins': wins, 'losses': self.result_stats['losses'], 'taxa': f"{taxa:.1f}%"}
-
-def catalogar_mhi(api, ativo, minutos=60, mg_niveis=1, qtd_loss_seguidos_analise=2, use_doji_filter=False):
-    agora = datetime.datetime.now()
+        latencia = self.latencias.geral('envio_ordem')
+        return {'ops': ops, 'wins': wins, 'losses': self.result_stats['losses'], 'taxa': f"{taxa:.1f}%",
+                'latencia': f"{latencia['p95']*1000:.0f} ms" if latencia else "-"}
+
+class LimitadorTaxa:
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0: time.sleep(espera)
+
+def coletar_catalogo_mhi(api, ativo, minutos=60, mg_niveis=1, limitador=None):
+    agora = api.relogio.agora_datetime()
     minuto_resto = agora.minute % 5
     end_time_dt = agora - datetime.timedelta(minutes=minuto_resto, seconds=agora.second, microseconds=agora.microsecond)
     end_time_timestamp = end_time_dt.timestamp()
@@ -609,86 +1972,47 @@ def catalogar_mhi(api, ativo, minutos=60, mg_niveis=1, qtd_loss_seguidos_analise
     velas_resultado_necessarias = 1 + mg_niveis
     total_velas_necessarias = minutos + (mg_niveis * 5) + 20
     
+    if limitador: limitador.aguardar()
     candles = api.get_candles(ativo, 60, total_velas_necessarias, end_time_timestamp)
     
     if not candles or len(candles) < 5 + velas_resultado_necessarias:
         return None
+    return candles
 
-    win_niveis = [0] * (mg_niveis + 1)
-    loss = 0
-    total_ciclos = 0
-    max_consecutive_count = 0
-    
-    consecutive_loss_counter = 0
-    wins_pos_sequencia = 0
-    oportunidades_pos_sequencia = 0
-    
-    consecutive_count = 0
-    last_dir = None
-    for c in candles:
-        current_dir = get_direction(c, use_doji_filter=use_doji_filter)
-        if current_dir != 'doji':
-            if current_dir == last_dir:
-                consecutive_count += 1
-            else:
-                last_dir = current_dir
-                consecutive_count = 1
-            if consecutive_count > max_consecutive_count:
-                 max_consecutive_count = consecutive_count
-
-    ciclos_passados = []
-    
-    for i in range(len(candles) - (5 + velas_resultado_necessarias), -1, -5):
-        quadrante_analise = candles[i : i+5]
-        quadrante_resultado = candles[i+5 : i+5+velas_resultado_necessarias]
-        
-        if len(quadrante_analise) != 5 or len(quadrante_resultado) != velas_resultado_necessarias:
-            continue
+def pontuar_mhi(ativo, from_, abertura, fechamento, maximo, minimo, mg_niveis=1, qtd_loss_seguidos_analise=2, use_doji_filter=False):
+    candles = SerieVelas.de_arrays(from_, abertura, fechamento, maximo, minimo)
+    direcoes = direcoes_velas(candles, use_doji_filter=use_doji_filter)
+    estatisticas = estatisticas_mhi(direcoes, mg_niveis, qtd_loss_seguidos_analise)
+    return resumir_catalogo('MHI', ativo, estatisticas, mg_niveis, maior_sequencia(direcoes))
 
-        ultimas_tres = quadrante_analise[2:5]
-        directions = [get_direction(c, use_doji_filter=use_doji_filter) for c in ultimas_tres]
+def coletar_catalogo_r2(api, ativo, minutos=CATALOGO_R2_MINUTOS, mg_niveis=1, limitador=None):
+    agora = api.relogio.agora()
+    end_time_timestamp = int(agora) // 60 * 60 - 60
+    total_velas_necessarias = minutos + R2_EMA_PERIODO * 3 + mg_niveis
 
-        if 'doji' in directions or directions.count('call') == directions.count('put'):
-            ciclos_passados.append({'resultado': 'invalido'})
-            continue
+    if limitador: limitador.aguardar()
+    candles = api.get_candles(ativo, 60, total_velas_necessarias, end_time_timestamp)
 
-        direcao_entrada = 'put' if directions.count('call') > directions.count('put') else 'call'
-        total_ciclos += 1
-        
-        resultado_encontrado = False
-        vitoria_de_primeira = False
-        for mg in range(velas_resultado_necessarias):
-            resultado_vela = get_direction(quadrante_resultado[mg], use_doji_filter=use_doji_filter)
-            if resultado_vela == 'doji': break
-            
-            if resultado_vela == direcao_entrada:
-                win_niveis[mg] += 1
-                if mg == 0: vitoria_de_primeira = True
-                resultado_encontrado = True
-                break
-        
-        if not resultado_encontrado: loss += 1
-        ciclos_passados.append({'resultado': 'win' if resultado_encontrado else 'loss', 'win_primeira': vitoria_de_primeira})
+    if not candles or len(candles) < R2_EMA_PERIODO * 3 + 1 + mg_niveis:
+        return None
+    return candles
 
-    ciclos_passados.reverse()
-    for i in range(len(ciclos_passados)):
-        if ciclos_passados[i]['resultado'] == 'loss':
-            consecutive_loss_counter += 1
-        else:
-            consecutive_loss_counter = 0
+def pontuar_r2(ativo, from_, abertura, fechamento, maximo, minimo, mg_niveis=1, qtd_loss_seguidos_analise=2, use_doji_filter=False):
+    candles = SerieVelas.de_arrays(from_, abertura, fechamento, maximo, minimo)
+    estatisticas = estatisticas_r2(sinais_r2(candles.open, candles.close), direcoes_velas(candles), mg_niveis, qtd_loss_seguidos_analise)
+    return resumir_catalogo('R2', ativo, estatisticas, mg_niveis, maior_sequencia(direcoes_velas(candles, use_doji_filter=use_doji_filter)))
 
-        if consecutive_loss_counter == qtd_loss_seguidos_analise:
-            if (i + 1) < len(ciclos_passados) and ciclos_passados[i+1]['resultado'] != 'invalido':
-                oportunidades_pos_sequencia += 1
-                if ciclos_passados[i+1]['win_primeira']:
-                    wins_pos_sequencia += 1
-            consecutive_loss_counter = 0
+def resumir_catalogo(estrategia, ativo, estatisticas, mg_niveis, max_consecutive_count):
+    win_niveis = estatisticas['wins']
+    loss = estatisticas['loss']
+    total_ciclos = estatisticas['total']
+    oportunidades_pos_sequencia = estatisticas['oportunidades_pos_loss']
+    wins_pos_sequencia = estatisticas['wins_pos_loss']
 
     if total_ciclos == 0: return None
 
     total_wins = sum(win_niveis)
     assertividade = (total_wins / total_ciclos * 100) if total_ciclos else 0
-    adx_val = api.get_adx(ativo, period=14, size=60)
     
     prob_loss = 1.0 - (assertividade / 100.0)
     prob_2_losses = prob_loss * prob_loss
@@ -696,14 +2020,14 @@ def catalogar_mhi(api, ativo, minutos=60, mg_niveis=1, qtd_loss_seguidos_analise
     acerto_pos_loss = (wins_pos_sequencia / oportunidades_pos_sequencia * 100) if oportunidades_pos_sequencia > 0 else 0
 
     return {
-        'strategy': 'MHI',
+        'strategy': estrategia,
         'ativo': ativo,
         'wins': win_niveis,
         'loss': loss,
         'total': total_ciclos,
         'assertividade': assertividade,
         'mg_niveis': mg_niveis,
-        'adx': adx_val,
+        'adx': None,
         'velas_consecutivas': max_consecutive_count,
         'prob_2_losses': prob_2_losses,
         'acerto_pos_loss': acerto_pos_loss,
@@ -711,6 +2035,161 @@ def catalogar_mhi(api, ativo, minutos=60, mg_niveis=1, qtd_loss_seguidos_analise
         'wins_pos_loss': wins_pos_sequencia
     }
 
+class AcumuladorCatalogo:
+    def __init__(self, estrategia, mg_niveis=1, qtd_loss_seguidos_analise=2, use_doji_filter=False, ultimo_from=None, interval=60):
+        self.estrategia = estrategia
+        self.mg_niveis = mg_niveis
+        self.qtd_loss_seguidos_analise = qtd_loss_seguidos_analise
+        self.use_doji_filter = use_doji_filter
+        self.ultimo_from = ultimo_from
+        self.interval = interval
+        self.velas_resultado = 1 + mg_niveis
+        if estrategia == "R2": self.antes, self.depois = R2_EMA_PERIODO * 3 - 1, self.velas_resultado - 1
+        else: self.antes, self.depois = 0, 5 + self.velas_resultado - 1
+        self._ancoras = []
+        self._codigos = []
+        self._sequencias = []
+
+    def adicionar(self, velas, proprio_inicio, proprio_fim):
+        if not velas: return
+        direcoes = direcoes_velas(velas, use_doji_filter=self.use_doji_filter)
+        if self.estrategia == "R2": ancoras, codigos = self._ciclos_r2(velas, proprio_inicio, proprio_fim)
+        else: ancoras, codigos = self._ciclos_mhi(velas, direcoes, proprio_inicio, proprio_fim)
+        if len(codigos):
+            self._ancoras.append(ancoras)
+            self._codigos.append(codigos)
+        proprias = direcoes[(velas.from_ >= proprio_inicio) & (velas.from_ <= proprio_fim)]
+        self._registrar_sequencia(proprio_inicio, proprias[proprias != 0])
+
+    def _ciclos_mhi(self, velas, direcoes, proprio_inicio, proprio_fim):
+        quadrante = 5 * self.interval
+        limite = proprio_fim if self.ultimo_from is None else min(proprio_fim, self.ultimo_from - self.depois * self.interval)
+        ancoras = np.arange(-(-proprio_inicio // quadrante) * quadrante, limite + 1, quadrante, dtype=np.int64)
+        posicoes = velas.posicoes((ancoras[:, None] + self.interval * np.arange(5 + self.velas_resultado)).ravel()).reshape(len(ancoras), 5 + self.velas_resultado)
+        completos = np.all(posicoes >= 0, axis=1)
+        janela = np.where(posicoes >= 0, direcoes[posicoes], 0)
+        ultimas_tres = janela[:, 2:5]
+        validos = completos & np.all(ultimas_tres != 0, axis=1)
+        entrada = -np.sign(ultimas_tres.sum(axis=1, dtype=np.int16))
+        return ancoras, codificar_ciclos(entrada, janela[:, 5:], validos)
+
+    def _ciclos_r2(self, velas, proprio_inicio, proprio_fim):
+        sinais = sinais_r2(velas.open, velas.close)
+        indices = np.flatnonzero((sinais != 0) & (velas.from_ >= proprio_inicio) & (velas.from_ <= proprio_fim))
+        indices = indices[indices + self.velas_resultado <= len(velas)]
+        resultados = direcoes_velas(velas)[indices[:, None] + np.arange(self.velas_resultado)]
+        return velas.from_[indices], codificar_ciclos(sinais[indices], resultados, np.ones(len(indices), dtype=bool))
+
+    def _registrar_sequencia(self, proprio_inicio, validas):
+        if not len(validas): return
+        limites = np.concatenate(([0], np.flatnonzero(validas[1:] != validas[:-1]) + 1, [len(validas)]))
+        corridas = np.diff(limites)
+        self._sequencias.append((proprio_inicio, int(validas[0]), int(corridas[0]), int(validas[-1]), int(corridas[-1]), int(corridas.max()), len(corridas) == 1))
+
+    def maior_sequencia(self):
+        maior, atual, direcao = 0, 0, 0
+        for _, primeira, inicial, ultima, final, interna, unica in sorted(self._sequencias):
+            continua = atual if primeira == direcao else 0
+            if unica:
+                atual, direcao = continua + inicial, primeira
+            else:
+                maior = max(maior, continua + inicial, interna)
+                atual, direcao = final, ultima
+            maior = max(maior, atual)
+        return maior
+
+    def resumo(self, ativo):
+        if not self._codigos: return None
+        ancoras = np.concatenate(self._ancoras)
+        codigos = np.concatenate(self._codigos)[np.argsort(ancoras, kind='stable')]
+        estatisticas = estatisticas_codigos(codigos, self.velas_resultado, self.qtd_loss_seguidos_analise)
+        return resumir_catalogo(self.estrategia, ativo, estatisticas, self.mg_niveis, self.maior_sequencia())
+
+def catalogar_historico(api, ativo, estrategia="MHI", dias=7, mg_niveis=1, qtd_loss_seguidos_analise=2, use_doji_filter=False, limitador=None):
+    fim = int(api.relogio.agora()) // 60 * 60 - 60
+    acumulador = AcumuladorCatalogo(estrategia, mg_niveis, qtd_loss_seguidos_analise, use_doji_filter, ultimo_from=fim)
+    for velas, proprio_inicio, proprio_fim in api.historico_velas(ativo, 60, fim - dias * 86400 + 60, fim, acumulador.antes, acumulador.depois, limitador=limitador):
+        acumulador.adicionar(velas, proprio_inicio, proprio_fim)
+    resultado = acumulador.resumo(ativo)
+    if resultado:
+        if limitador: limitador.aguardar()
+        resultado['adx'] = api.get_adx(ativo, period=14, size=60)
+    return resultado
+
+def coletar_historico(api, ativo, dias=VARREDURA_DIAS_PADRAO, limitador=None):
+    fim = int(api.relogio.agora()) // 60 * 60 - 60
+    paginas = [velas.intervalo(proprio_inicio, proprio_fim + 60) for velas, proprio_inicio, proprio_fim in api.historico_velas(ativo, 60, fim - dias * 86400 + 60, fim, limitador=limitador)]
+    paginas = [pagina for pagina in reversed(paginas) if pagina]
+    if not paginas: return None
+    return SerieVelas.de_arrays(*(np.concatenate([getattr(pagina, campo) for pagina in paginas]) for campo in ('from_', 'open', 'close', 'max', 'min')))
+
+def resumir_varredura(estrategia, ativo, estatisticas, mg_niveis, qtd_loss_seguidos, **parametros):
+    resultado = resumir_catalogo(estrategia, ativo, estatisticas, mg_niveis, None)
+    if resultado: resultado.update(qtd_loss_seguidos=qtd_loss_seguidos, **parametros)
+    return resultado
+
+def varrer_mhi(ativo, from_, abertura, fechamento, maximo, minimo, qtds_loss=VARREDURA_LOSS_SEGUIDOS):
+    velas = SerieVelas.de_arrays(from_, abertura, fechamento, maximo, minimo)
+    tamanho = 5 + 1 + max(VARREDURA_MG)
+    if len(velas) < tamanho: return []
+    ancoras = np.arange(-(-int(velas.from_[0]) // 300) * 300, int(velas.from_[-1]) + 1, 300, dtype=np.int64)
+    posicoes = velas.posicoes((ancoras[:, None] + 60 * np.arange(tamanho)).ravel()).reshape(len(ancoras), tamanho)
+    presentes = np.logical_and.accumulate(posicoes >= 0, axis=1)
+    adx = np.full(len(ancoras), np.nan)
+    com_adx = presentes[:, 5] & (posicoes[:, 5] >= 15)
+    if com_adx.any():
+        janelas = posicoes[com_adx, 5][:, None] + np.arange(-15, 1)
+        adx[com_adx] = calcular_adx_lote(velas.max[janelas], velas.min[janelas], velas.close[janelas], 14)
+    sinal = np.sign(velas.close - velas.open).astype(np.int8)
+    amplitude = velas.max - velas.min
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corpo_percentual = np.abs(velas.close - velas.open) / amplitude * 100
+    linhas = []
+    for doji in VARREDURA_DOJI:
+        direcoes = sinal if doji is None else np.where((amplitude == 0) | (corpo_percentual < doji), 0, sinal).astype(np.int8)
+        janela = np.where(posicoes >= 0, direcoes[posicoes], 0)
+        ultimas_tres = janela[:, 2:5]
+        entrada = -np.sign(ultimas_tres.sum(axis=1, dtype=np.int16))
+        validos = np.all(ultimas_tres != 0, axis=1)
+        for mg_niveis in VARREDURA_MG:
+            velas_resultado = 1 + mg_niveis
+            codigos = codificar_ciclos(entrada, janela[:, 5:5 + velas_resultado], validos & presentes[:, 4 + velas_resultado])
+            for corte_adx in VARREDURA_ADX:
+                operados = None if corte_adx is None else ~(adx >= corte_adx)
+                for qtd_loss in qtds_loss:
+                    estatisticas = estatisticas_codigos(codigos, velas_resultado, qtd_loss, operados)
+                    linhas.append(resumir_varredura('MHI', ativo, estatisticas, mg_niveis, qtd_loss, doji=doji, corte_adx=corte_adx))
+    return [linha for linha in linhas if linha]
+
+def varrer_r2(ativo, from_, abertura, fechamento, maximo, minimo, qtds_loss=VARREDURA_LOSS_SEGUIDOS):
+    rsi, tendencia = indicadores_r2(abertura, fechamento)
+    direcoes = direcoes_velas(SerieVelas.de_arrays(from_, abertura, fechamento, maximo, minimo))
+    linhas = []
+    for rsi_compra in VARREDURA_RSI_COMPRA:
+        for rsi_venda in VARREDURA_RSI_VENDA:
+            sinais = sinais_indicadores_r2(rsi, tendencia, rsi_compra, rsi_venda)
+            todos = np.flatnonzero(sinais)
+            for mg_niveis in VARREDURA_MG:
+                velas_resultado = 1 + mg_niveis
+                indices = todos[todos + velas_resultado <= len(direcoes)]
+                codigos = codificar_ciclos(sinais[indices], direcoes[indices[:, None] + np.arange(velas_resultado)], np.ones(len(indices), dtype=bool))
+                for qtd_loss in qtds_loss:
+                    estatisticas = estatisticas_codigos(codigos, velas_resultado, qtd_loss)
+                    linhas.append(resumir_varredura('R2', ativo, estatisticas, mg_niveis, qtd_loss, rsi_compra=rsi_compra, rsi_venda=rsi_venda))
+    return [linha for linha in linhas if linha]
+
+def descrever_varredura(linha, pos_loss=False):
+    partes = [linha['ativo'], f"MG {linha['mg_niveis']}"]
+    if pos_loss: partes.append(f"Loss {linha['qtd_loss_seguidos']}")
+    if linha['strategy'] == 'R2':
+        partes.append(f"RSI {linha['rsi_compra']}/{linha['rsi_venda']}")
+    else:
+        partes.append("Doji off" if linha['doji'] is None else f"Doji {linha['doji']:g}%")
+        partes.append("ADX off" if linha['corte_adx'] is None else f"ADX<{linha['corte_adx']}")
+    texto = " | ".join(partes) + f" -> {linha['assertividade']:.2f}% ({sum(linha['wins'])}/{linha['total']})"
+    if pos_loss: texto += f" | Pós-Loss: {linha['acerto_pos_loss']:.0f}% ({linha['wins_pos_loss']}/{linha['oportunidades_pos_loss']})"
+    return texto
+
 class BotFullApp(tk.Tk):
     LOG_COLORS = {
         "dark": {
@@ -736,6 +2215,7 @@ class BotFullApp(tk.Tk):
         self.api = None
         self.connected = False
         self.robot = None
+        self.pool_catalogo = None
         self.robot_thread = None
         self.robot_stop = threading.Event()
         self.ativos = []
@@ -789,6 +2269,8 @@ class BotFullApp(tk.Tk):
         self.check_save_login.grid(row=1, column=1, columnspan=2, padx=6, pady=4, sticky="w")
         self.check_sons = ttk.Checkbutton(frame_conn, text="Sons ativados", variable=self.sons_ativos, command=self.update_check_sons_label)
         self.check_sons.grid(row=1, column=3, padx=8, pady=4, sticky="w")
+        self.var_simulada = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame_conn, text="Corretora Simulada", variable=self.var_simulada).grid(row=1, column=4, columnspan=2, padx=8, pady=4, sticky="w")
 
         self.main = ttk.Frame(self)
         self.main.pack(fill="both", expand=True, padx=10, pady=5)
@@ -831,6 +2313,7 @@ class BotFullApp(tk.Tk):
         btns_ativos.grid(row=2, column=0, pady=5)
         ttk.Button(btns_ativos, text="Listar Ativos", command=self.atualiza_ativos).pack(side="left", padx=3)
         ttk.Button(btns_ativos, text="Analisar Assertividade", command=self.catalogar_ativo).pack(side="left", padx=3)
+        ttk.Button(btns_ativos, text="Varredura de Parâmetros", command=self.varrer_parametros).pack(side="left", padx=3)
         self.lbl_clock = tk.Label(frame_ativos, text="", font=("Arial", 28, "bold"), fg="#FFD700", bg="#222")
         self.lbl_clock.grid(row=3, column=0, pady=(12, 6))
 
@@ -904,11 +2387,41 @@ class BotFullApp(tk.Tk):
         row += 1
         self.var_entradas_simultaneas = tk.BooleanVar(value=True)
         ttk.Checkbutton(frame_config, text="Entradas Simultâneas", variable=self.var_entradas_simultaneas).grid(row=row, column=0, columnspan=3, padx=4, pady=3, sticky="w")
+        ttk.Label(frame_config, text="Máx. Posições:").grid(row=row, column=3, padx=4, pady=3, sticky="e")
+        self.spin_max_posicoes = ttk.Spinbox(frame_config, from_=1, to=50, width=5)
+        self.spin_max_posicoes.set(MAX_POSICOES_ABERTAS)
+        self.spin_max_posicoes.grid(row=row, column=4, padx=4, pady=3)
+        row += 1
+        ttk.Label(frame_config, text="Workers Corretora:").grid(row=row, column=0, padx=4, pady=3, sticky="e")
+        self.spin_workers_corretora = ttk.Spinbox(frame_config, from_=1, to=32, width=5)
+        self.spin_workers_corretora.set(MAX_WORKERS_CORRETORA)
+        self.spin_workers_corretora.grid(row=row, column=1, padx=4, pady=3)
+        ttk.Label(frame_config, text="Prazo Fila Posições (s):").grid(row=row, column=2, padx=4, pady=3, sticky="e")
+        self.spin_prazo_entrada = ttk.Spinbox(frame_config, from_=1, to=30, width=5)
+        self.spin_prazo_entrada.set(PRAZO_ENTRADA_SEGUNDOS)
+        self.spin_prazo_entrada.grid(row=row, column=3, padx=4, pady=3)
+        row += 1
+        ttk.Label(frame_config, text="Atraso Entrada (s):").grid(row=row, column=0, padx=4, pady=3, sticky="e")
+        self.spin_atraso_entrada = ttk.Spinbox(frame_config, from_=0, to=30, increment=0.1, width=5)
+        self.spin_atraso_entrada.set(ATRASO_ENTRADA_SEGUNDOS)
+        self.spin_atraso_entrada.grid(row=row, column=1, padx=4, pady=3)
+        ttk.Label(frame_config, text="Orçamento Disparo (s):").grid(row=row, column=2, padx=4, pady=3, sticky="e")
+        self.spin_orcamento_latencia = ttk.Spinbox(frame_config, from_=0.1, to=10, increment=0.1, width=5)
+        self.spin_orcamento_latencia.set(ORCAMENTO_LATENCIA_SEGUNDOS)
+        self.spin_orcamento_latencia.grid(row=row, column=3, padx=4, pady=3)
         
         row += 1
         self.var_r2_detailed_log = tk.BooleanVar(value=False)
         ttk.Checkbutton(frame_config, text="Log Detalhado (R2)", variable=self.var_r2_detailed_log).grid(row=row, column=0, columnspan=3, padx=4, pady=3, sticky="w")
 
+        row += 1
+        self.var_stream_velas = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame_config, text="Stream de Velas (tempo real)", variable=self.var_stream_velas).grid(row=row, column=0, columnspan=3, padx=4, pady=3, sticky="w")
+        ttk.Label(frame_config, text="Catálogo (dias):").grid(row=row, column=3, padx=4, pady=3, sticky="e")
+        self.spin_catalogo_dias = ttk.Spinbox(frame_config, from_=0, to=CATALOGO_DIAS_MAX, width=5)
+        self.spin_catalogo_dias.set(0)
+        self.spin_catalogo_dias.grid(row=row, column=4, padx=4, pady=3)
+
         frame_ctrl = ttk.LabelFrame(self.main, text="Controle")
         frame_ctrl.grid(row=1, column=1, sticky="nswe", padx=6, pady=4)
         self.btn_start = ttk.Button(frame_ctrl, text="▶️ Iniciar Robô", command=self.start_robot)
@@ -918,6 +2431,8 @@ class BotFullApp(tk.Tk):
         ttk.Label(frame_ctrl, text="Status:").grid(row=0, column=2, padx=8, pady=9)
         self.lbl_robostatus = ttk.Label(frame_ctrl, text="Inativo", foreground="red")
         self.lbl_robostatus.grid(row=0, column=3, padx=6, pady=9)
+        ttk.Button(frame_ctrl, text="⏱️ Latências", command=self.mostrar_latencias).grid(row=1, column=0, padx=8, pady=(0, 9))
+        ttk.Button(frame_ctrl, text="💾 Exportar Latências", command=self.exportar_latencias).grid(row=1, column=1, padx=8, pady=(0, 9))
 
         stats = ttk.LabelFrame(self.main, text="Estatísticas")
         stats.grid(row=1, column=2, sticky="nswe", padx=6, pady=4)
@@ -933,6 +2448,9 @@ class BotFullApp(tk.Tk):
         ttk.Label(stats, text="Taxa:").grid(row=0, column=6, padx=4, pady=2)
         self.lbl_taxa = ttk.Label(stats, text="0%")
         self.lbl_taxa.grid(row=0, column=7)
+        ttk.Label(stats, text="Latência p95:").grid(row=1, column=0, columnspan=2, padx=4, pady=2)
+        self.lbl_latencia = ttk.Label(stats, text="-")
+        self.lbl_latencia.grid(row=1, column=2, columnspan=2)
         frame_lucro = ttk.LabelFrame(self.main, text="Lucro/Prejuízo Atual")
         frame_lucro.grid(row=0, column=2, sticky="nswe", padx=6, pady=4)
         self.lbl_lucro = ttk.Label(frame_lucro, text="R$ 0,00", font=("Arial", 22, "bold"), foreground="#2DC937")
@@ -993,8 +2511,8 @@ class BotFullApp(tk.Tk):
             except Exception: pass
 
     def update_clock(self):
-        from datetime import datetime
-        self.lbl_clock.config(text=datetime.now().strftime("%H:%M:%S"))
+        agora = self.api.relogio.agora_datetime() if self.api and self.connected else datetime.datetime.now()
+        self.lbl_clock.config(text=agora.strftime("%H:%M:%S"))
         self.after(1000, self.update_clock)
 
     def toggle_theme(self):
@@ -1018,17 +2536,19 @@ class BotFullApp(tk.Tk):
         email = self.entry_email.get().strip()
         senha = self.entry_senha.get().strip()
         conta = self.combo_conta.get().upper()
-        if not email or not senha:
+        simulada = self.var_simulada.get()
+        if not simulada and (not email or not senha):
             self.log_event("Preencha email e senha para conectar.", "#FF4040")
             self.robot_sound("conexao_erro")
             return
         self.log_event("Tentando conectar à corretora...", "#00BFFF")
         self.update()
-        threading.Thread(target=self._connect_thread, args=(email, senha, conta), daemon=True).start()
+        threading.Thread(target=self._connect_thread, args=(email, senha, conta, simulada), daemon=True).start()
 
-    def _connect_thread(self, email, senha, conta):
+    def _connect_thread(self, email, senha, conta, simulada=False):
         try:
-            api = IQOptionAPI(email, senha)
+            if simulada: api = IQOptionAPI(email, senha, backend=CorretoraSimulada())
+            else: api = IQOptionAPI(email, senha, arquivo=ArquivoVelas(ARQUIVO_VELAS_DIR))
             status, reason = api.connect()
             if status:
                 api.change_balance(conta)
@@ -1173,10 +2693,6 @@ class BotFullApp(tk.Tk):
             self.log_event("Conecte-se para analisar assertividade.", "#FF4040"); return
         
         strategy = self.combo_strategy.get()
-
-        if strategy == "R2":
-            self.log_event("Função de catalogação para R2 ainda não implementada.", "#FF8000")
-            return
         
         selecionados = self.get_selected_ativos()
         if self.var_martingale.get():
@@ -1187,33 +2703,136 @@ class BotFullApp(tk.Tk):
             
         try: qtd_loss_analise = int(self.spin_loss_seguidos.get())
         except Exception: qtd_loss_analise = 2
+        try: dias = min(max(int(self.spin_catalogo_dias.get()), 0), CATALOGO_DIAS_MAX)
+        except Exception: dias = 0
         ativos_analisar = selecionados or self.ativos
         if not ativos_analisar: self.log_event("Nenhum ativo para analisar.", "#FF8000"); return
         
-        self.log_event(f"Analisando assertividade (MHI) de {len(ativos_analisar)} ativo(s)...", "#00BFFF")
-        threading.Thread(target=self._catalogar_thread, args=(ativos_analisar, mg_niveis, qtd_loss_analise), daemon=True).start()
+        periodo = f", {dias} dia(s)" if dias else ""
+        self.log_event(f"Analisando assertividade ({strategy}{periodo}) de {len(ativos_analisar)} ativo(s)...", "#00BFFF")
+        threading.Thread(target=self._catalogar_thread, args=(ativos_analisar, mg_niveis, qtd_loss_analise, strategy, dias), daemon=True).start()
+
+    def varrer_parametros(self):
+        if not self.api or not self.connected:
+            self.log_event("Conecte-se para varrer parâmetros.", "#FF4040"); return
+        strategy = self.combo_strategy.get()
+        try: dias = min(max(int(self.spin_catalogo_dias.get()), 0), CATALOGO_DIAS_MAX) or VARREDURA_DIAS_PADRAO
+        except Exception: dias = VARREDURA_DIAS_PADRAO
+        pos_loss = self.var_filtro_loss_seguidos.get()
+        if pos_loss: qtds_loss = VARREDURA_LOSS_SEGUIDOS
+        else:
+            try: qtds_loss = (int(self.spin_loss_seguidos.get()),)
+            except Exception: qtds_loss = (2,)
+        ativos_analisar = self.get_selected_ativos() or self.ativos
+        if not ativos_analisar: self.log_event("Nenhum ativo para analisar.", "#FF8000"); return
+        self.log_event(f"Varrendo parâmetros ({strategy}, {dias} dia(s)) de {len(ativos_analisar)} ativo(s)...", "#00BFFF")
+        threading.Thread(target=self._varredura_thread, args=(ativos_analisar, strategy, dias, qtds_loss, pos_loss), daemon=True).start()
+
+    def _varredura_thread(self, ativos_analisar, strategy, dias, qtds_loss, pos_loss):
+        linhas = []
+        limitador = LimitadorTaxa(LIMITE_REQUISICOES_CATALOGO)
+        varrer = varrer_r2 if strategy == "R2" else varrer_mhi
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS_COLETA, thread_name_prefix="varredura") as downloads:
+            pool = self._pool_catalogo() or downloads
+            baixando = {downloads.submit(coletar_historico, self.api, ativo, dias, limitador): ativo for ativo in ativos_analisar}
+            varrendo = {}
+            while baixando or varrendo:
+                prontos, _ = wait(set(baixando) | set(varrendo), return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    if futuro in baixando:
+                        ativo = baixando.pop(futuro)
+                        try: velas = futuro.result()
+                        except Exception as e: print(f"Erro baixando {ativo}: {e}"); continue
+                        if not velas: continue
+                        args = (ativo, velas.from_, velas.open, velas.close, velas.max, velas.min, qtds_loss)
+                        try: varrendo[pool.submit(varrer, *args)] = ativo
+                        except Exception:
+                            self.pool_catalogo = None
+                            pool = downloads
+                            varrendo[pool.submit(varrer, *args)] = ativo
+                        continue
+                    ativo = varrendo.pop(futuro)
+                    try: linhas.extend(futuro.result())
+                    except Exception as e: print(f"Erro varrendo {ativo}: {e}")
+
+        chave, amostra = ('acerto_pos_loss', 'oportunidades_pos_loss') if pos_loss else ('assertividade', 'total')
+        ranking = sorted((l for l in linhas if l[amostra] >= VARREDURA_MIN_AMOSTRAS), key=lambda l: (l[chave], l[amostra]), reverse=True)
+        if not ranking:
+            self.log_event("Nenhuma combinação com amostra suficiente.", "#FF4040")
+            return
+        self.log_event(f"Varredura ({strategy}): {len(linhas)} combinações em {time.monotonic() - inicio:.1f}s. Melhores:", "#FFD700")
+        for posicao, linha in enumerate(ranking[:VARREDURA_TOP], 1):
+            self.log_event(f"{posicao:>2}. {descrever_varredura(linha, pos_loss)}", "#FFD700")
+        try:
+            with open(ARQUIVO_VARREDURA, "w", encoding="utf-8") as f: json.dump(ranking, f, indent=2)
+            self.log_event(f"Tabela completa salva em {os.path.abspath(ARQUIVO_VARREDURA)}.", "#2DC937")
+        except Exception as e:
+            self.log_event(f"Erro ao salvar varredura: {e}", "#FF4040")
 
-    def _catalogar_thread(self, ativos_analisar, mg_niveis, qtd_loss_analise):
+    def _pool_catalogo(self):
+        if self.pool_catalogo is None:
+            try: self.pool_catalogo = ProcessPoolExecutor(max_workers=MAX_PROCESSOS_CATALOGO)
+            except Exception: return None
+        return self.pool_catalogo
+
+    def _catalogar_thread(self, ativos_analisar, mg_niveis, qtd_loss_analise, strategy="MHI", dias=0):
         resultados = []
         try: payouts = self.api.get_all_profit()
         except Exception: payouts = {}; self.log_event("Não foi possível obter os payouts.", "#FF8000")
-        
-        for ativo in ativos_analisar:
-            try:
-                res = catalogar_mhi(self.api, ativo, minutos=60, mg_niveis=mg_niveis, qtd_loss_seguidos_analise=qtd_loss_analise, use_doji_filter=self.var_doji_filter.get())
-                if res:
-                    payout_info = payouts.get(ativo, {})
-                    payout = payout_info.get('turbo') or payout_info.get('binary')
-                    res['payout'] = payout
-                    resultados.append(res)
-            except Exception as e: print(f"Erro catalogando {ativo}: {e}")
+        use_doji_filter = self.var_doji_filter.get()
+        limitador = LimitadorTaxa(LIMITE_REQUISICOES_CATALOGO)
+        inicio = time.monotonic()
+        if strategy == "R2": coletar, pontuar, minutos = coletar_catalogo_r2, pontuar_r2, CATALOGO_R2_MINUTOS
+        else: coletar, pontuar, minutos = coletar_catalogo_mhi, pontuar_mhi, 60
+
+        def baixar(ativo):
+            if dias: return catalogar_historico(self.api, ativo, strategy, dias, mg_niveis, qtd_loss_analise, use_doji_filter, limitador)
+            candles = coletar(self.api, ativo, minutos=minutos, mg_niveis=mg_niveis, limitador=limitador)
+            if candles is None: return None
+            limitador.aguardar()
+            return candles, self.api.get_adx(ativo, period=14, size=60)
+
+        def registrar(res):
+            payout_info = payouts.get(res['ativo'], {})
+            res['payout'] = payout_info.get('turbo') or payout_info.get('binary')
+            resultados.append(res)
+            self.log_event(f"{res['ativo']} -> {res['assertividade']:.2f}% ({len(resultados)} analisado(s) em {time.monotonic() - inicio:.1f}s)", self.get_log_color("#FFFFFF"))
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS_COLETA, thread_name_prefix="catalogo") as downloads:
+            pool = self._pool_catalogo() or downloads
+            baixando = {downloads.submit(baixar, ativo): ativo for ativo in ativos_analisar}
+            pontuando = {}
+            while baixando or pontuando:
+                prontos, _ = wait(set(baixando) | set(pontuando), return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    if futuro in baixando:
+                        ativo = baixando.pop(futuro)
+                        try: dados = futuro.result()
+                        except Exception as e: print(f"Erro catalogando {ativo}: {e}"); continue
+                        if not dados: continue
+                        if isinstance(dados, dict): registrar(dados); continue
+                        candles, adx_val = dados
+                        args = (ativo, candles.from_, candles.open, candles.close, candles.max, candles.min, mg_niveis, qtd_loss_analise, use_doji_filter)
+                        try: pontuando[pool.submit(pontuar, *args)] = (ativo, adx_val)
+                        except Exception:
+                            self.pool_catalogo = None
+                            pool = downloads
+                            pontuando[pool.submit(pontuar, *args)] = (ativo, adx_val)
+                        continue
+                    ativo, adx_val = pontuando.pop(futuro)
+                    try: res = futuro.result()
+                    except Exception as e: print(f"Erro catalogando {ativo}: {e}"); continue
+                    if not res: continue
+                    res['adx'] = adx_val
+                    registrar(res)
         
         if not resultados: 
             self.log_event("Nenhum ativo pôde ser analisado.", "#FF4040")
             return
             
         melhores = sorted(resultados, key=lambda x: x['assertividade'], reverse=True)
-        self.log_event("Melhores Ativos (MHI):", "#FFD700")
+        self.log_event(f"Melhores Ativos ({strategy}):", "#FFD700")
         
         for r in melhores[:5]:
             wins_str_parts = [f"W0: {r['wins'][0]}"]
@@ -1278,7 +2897,13 @@ class BotFullApp(tk.Tk):
                 "esperar_novo_loss": self.var_esperar_novo_loss.get(),
                 "soros_em_mg": self.var_soros_em_mg.get(),
                 "entradas_simultaneas": self.var_entradas_simultaneas.get(),
-                "r2_detailed_log": self.var_r2_detailed_log.get()
+                "max_posicoes": int(self.spin_max_posicoes.get()),
+                "workers_corretora": int(self.spin_workers_corretora.get()),
+                "prazo_entrada": int(self.spin_prazo_entrada.get()),
+                "atraso_entrada": float(self.spin_atraso_entrada.get().replace(",", ".")),
+                "orcamento_latencia": float(self.spin_orcamento_latencia.get().replace(",", ".")),
+                "r2_detailed_log": self.var_r2_detailed_log.get(),
+                "stream_velas": self.var_stream_velas.get()
             }
         except Exception as e: self.log_event(f"Preencha corretamente as configurações. Erro: {e}", "#FF4040"); return
         self.robot_stop.clear()
@@ -1305,6 +2930,28 @@ class BotFullApp(tk.Tk):
         self.lbl_wins.config(text=str(stats['wins']))
         self.lbl_losses.config(text=str(stats['losses']))
         self.lbl_taxa.config(text=stats['taxa'])
+        self.lbl_latencia.config(text=stats.get('latencia', "-"))
+
+    def mostrar_latencias(self):
+        if not self.robot: self.log_event("Nenhuma latência registrada ainda.", "#FF8000"); return
+        percentis = self.robot.latencias.percentis()
+        if not percentis: self.log_event("Nenhuma latência registrada ainda.", "#FF8000"); return
+        self.log_event("Latências por ativo (p50 / p95 / p99 em ms):", "#00BFFF")
+        for ativo, etapas in sorted(percentis.items()):
+            partes = []
+            for nome, _, _ in ETAPAS_LATENCIA:
+                if nome not in etapas: continue
+                e = etapas[nome]
+                partes.append(f"{nome}: {e['p50']*1000:.0f}/{e['p95']*1000:.0f}/{e['p99']*1000:.0f}")
+            self.log_event(f"-> {ativo} | " + " | ".join(partes), self.get_log_color("#FFFFFF"))
+
+    def exportar_latencias(self):
+        if not self.robot: self.log_event("Nenhuma latência registrada ainda.", "#FF8000"); return
+        try:
+            caminho = self.robot.latencias.exportar(ARQUIVO_LATENCIAS)
+            self.log_event(f"Latências exportadas para {os.path.abspath(caminho)}.", "#2DC937")
+        except Exception as e:
+            self.log_event(f"Erro ao exportar latências: {e}", "#FF4040")
 
     def update_lucro(self, valor):
         self.lucro_acumulado_display = valor
@@ -1319,5 +2966,6 @@ class BotFullApp(tk.Tk):
         self.log_event("Lucro/Prejuízo zerado manually.", "#FFA500")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = BotFullApp()
     app.mainloop()
\ No newline at end of file